@@ -6,10 +6,58 @@ This package provides clients for interacting with EHRbase:
 - EHRbaseHttpClient: Low-level HTTP client
 - TemplateClient: Client for template operations
 - CompositionClient: Client for composition operations
+- EHRNotFoundError: Raised when an EHR does not exist
+
+Long-running applications should share one client (and its connection pool)
+by calling get_default_client() instead of constructing EHRbaseClient per request.
 """
 
-# Import main client classes for easier access
-from .client import EHRbaseClient
-from .http_client import EHRbaseHttpClient
-from .template_client import TemplateClient
-from .composition_client import CompositionClient
+import asyncio
+import importlib
+
+# Main client classes for easier access, imported lazily (PEP 562) so that
+# scripts only load the modules they actually use
+_LAZY_IMPORTS = {
+    "EHRbaseClient": ".client",
+    "EHRbaseHttpClient": ".http_client",
+    "TemplateClient": ".template_client",
+    "CompositionClient": ".composition_client",
+    "EHRNotFoundError": ".ehr_client",
+}
+
+__all__ = list(_LAZY_IMPORTS) + ["get_default_client"]
+
+# Process-wide shared client, created by get_default_client()
+_default_client = None
+_default_client_lock = asyncio.Lock()
+
+async def get_default_client():
+    """
+    Get the shared EHRbaseClient, creating and opening it on first call.
+    
+    Concurrent first calls are serialized so only one client (and one
+    connection pool) is ever created.
+    
+    Returns:
+        The shared EHRbaseClient instance
+    """
+    global _default_client
+    if _default_client is None:
+        async with _default_client_lock:
+            if _default_client is None:
+                from .client import EHRbaseClient
+                client = EHRbaseClient()
+                await client.__aenter__()
+                _default_client = client
+    return _default_client
+
+def __getattr__(name):
+    if name not in _LAZY_IMPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    
+    value = getattr(importlib.import_module(_LAZY_IMPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -3,14 +3,11 @@ EHRbase client facade for OpenEHR operations.
 
 This module provides a facade for accessing specialized clients for the EHRbase REST API.
 """
-import os
+import importlib
+from cachetools import TTLCache
 # Use a simple import that works with the project structure
-from utils.logging_utils import get_logger
+from ehrbase.utils.logging_utils import get_logger
 from .http_client import EHRbaseHttpClient
-from .template_client import TemplateClient
-from .composition_client import CompositionClient
-from .ehr_client import EHRClient
-from .query_client import QueryClient
 from .format_config import FormatConfig
 
 class EHRbaseClient:
@@ -20,9 +17,26 @@ class EHRbaseClient:
     This class provides a unified interface to access both template
     and composition operations, while maintaining separation of concerns
     between these different domains internally.
+    
+    The specialized domain clients are imported and created on first access,
+    so callers only pay for the domains they use.
     """
     
-    def __init__(self, base_url=None, default_ehr_id=None, json_format=None):
+    # Domain client attribute -> (module, class) within this package
+    DOMAIN_CLIENTS = {
+        "templates": ("template_client", "TemplateClient"),
+        "compositions": ("composition_client", "CompositionClient"),
+        "ehrs": ("ehr_client", "EHRClient"),
+        "queries": ("query_client", "QueryClient"),
+    }
+    
+    # Subject lookups are memoized briefly. Changes made through this client drop
+    # the affected entries; the TTL bounds staleness from changes made elsewhere
+    # (other processes, or calls made directly on the domain clients).
+    SUBJECT_CACHE_SIZE = 1024
+    SUBJECT_CACHE_TTL = 60
+    
+    def __init__(self, base_url=None, default_ehr_id=None, json_format=None, transport=None):
         """
         Initialize the EHRbase client facade.
         
@@ -30,26 +44,54 @@ class EHRbaseClient:
             base_url: The base URL of the EHRbase API (default from env var EHRBASE_URL)
             default_ehr_id: Default EHR ID to use (default from env var DEFAULT_EHR_ID)
             json_format: JSON format mode to use (canonical, wt_flat, wt_structured)
+            transport: Optional httpx transport for the shared HTTP client (see EHRbaseHttpClient)
         """
         self.logger = get_logger("ehrbase_client")
         
-        # Create format configuration
-        self.format_config = FormatConfig(json_format)
+        # Create format configuration, sharing the default one unless a mode is given
+        self.format_config = FormatConfig(json_format) if json_format else FormatConfig.default()
         
         # Create shared HTTP client
-        self.http_client = EHRbaseHttpClient(base_url, default_ehr_id)
-        
-        # Create specialized domain clients
-        self.templates = TemplateClient(self.http_client, self.format_config)
-        self.compositions = CompositionClient(self.http_client, self.format_config)
-        self.ehrs = EHRClient(self.http_client, self.format_config)
-        self.queries = QueryClient(self.http_client, self.format_config)
+        self.http_client = EHRbaseHttpClient(base_url, default_ehr_id, transport=transport)
         
         # Expose default EHR ID for convenience
         self.default_ehr_id = self.http_client.default_ehr_id
         
+        # EHRs looked up by (subject_id, subject_namespace, format_type)
+        self._subject_cache = TTLCache(maxsize=self.SUBJECT_CACHE_SIZE, ttl=self.SUBJECT_CACHE_TTL)
+        
+        # Bumped on every invalidation, so lookups that overlap one are not cached
+        self._subject_cache_generation = 0
+        
         self.logger.info(f"Initialized EHRbaseClient facade with URL: {self.http_client.base_url} and JSON format: {self.format_config.json_format}")
     
+    def __getattr__(self, name):
+        """Create specialized domain clients lazily on first access."""
+        if name not in self.DOMAIN_CLIENTS:
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+        
+        module_name, class_name = self.DOMAIN_CLIENTS[name]
+        module = importlib.import_module(f".{module_name}", __package__)
+        domain_client = getattr(module, class_name)(self.http_client, self.format_config)
+        
+        # Store on the instance so later lookups bypass __getattr__
+        setattr(self, name, domain_client)
+        return domain_client
+    
+    async def __aenter__(self):
+        await self.http_client.__aenter__()
+        return self
+    
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
+    
+    async def aclose(self):
+        """Close the shared HTTP client and its pooled connections."""
+        await self.http_client.aclose()
+    
+    # Alias for callers that expect the conventional close() name
+    close = aclose
+    
     # Template operations - delegated to template client
     
     async def get_template_list(self, format_type=None):
@@ -60,8 +102,17 @@ class EHRbaseClient:
         """Get a specific template by ID."""
         return await self.templates.get_template(template_id, format_type)
     
+    async def get_templates_bulk(self, template_ids, format_type=None, return_exceptions=False):
+        """Get several templates concurrently, returning results in order."""
+        return await self.templates.get_templates_bulk(template_ids, format_type, return_exceptions)
+    
     async def get_template_example(self, template_id, format_type=None):
-        """Generate an example composition based on a template."""
+        """
+        Generate an example composition based on a template.
+        
+        Examples are cached per template, but every call returns its own copy, so the
+        result can be filled in and sent with create_composition.
+        """
         return await self.templates.get_example_composition(template_id, format_type)
     
     # Composition operations - delegated to composition client
@@ -70,13 +121,25 @@ class EHRbaseClient:
         """Create a new composition in the EHR."""
         return await self.compositions.create_composition(ehr_id, composition_data, format_type, template_id)
     
+    async def create_compositions(self, ehr_id, compositions, format_type=None, return_exceptions=False, template_id=None):
+        """Create several compositions in the EHR concurrently, returning results in order."""
+        return await self.compositions.create_compositions_bulk(ehr_id, compositions, format_type, return_exceptions, template_id)
+    
+    async def create_compositions_batched(self, ehr_id, compositions, format_type=None, template_id=None, return_exceptions=False):
+        """Queue compositions for creation, coalescing concurrent callers into shared batches."""
+        return await self.compositions.create_compositions_batched(ehr_id, compositions, format_type, template_id, return_exceptions=return_exceptions)
+    
     async def get_composition(self, ehr_id, composition_uid, format_type=None):
         """Get a composition by its UID."""
         return await self.compositions.get_composition(ehr_id, composition_uid, format_type)
     
-    async def update_composition(self, ehr_id, composition_uid, composition_data, format_type=None):
+    async def get_compositions(self, ehr_id, composition_uids, format_type=None, return_exceptions=False):
+        """Get several compositions from the EHR concurrently, returning results in order."""
+        return await self.compositions.get_compositions(ehr_id, composition_uids, format_type, return_exceptions)
+    
+    async def update_composition(self, ehr_id, composition_uid, composition_data, format_type=None, template_id=None):
         """Update an existing composition."""
-        return await self.compositions.update_composition(ehr_id, composition_uid, composition_data, format_type)
+        return await self.compositions.update_composition(ehr_id, composition_uid, composition_data, format_type, template_id)
     
     async def delete_composition(self, ehr_id, preceding_version_uid, format_type=None):
         """Delete a composition by its preceding version UID."""
@@ -92,6 +155,14 @@ class EHRbaseClient:
         """Get an EHR by its ID."""
         return await self.ehrs.get_ehr(ehr_id, format_type)
     
+    async def ehr_exists(self, ehr_id):
+        """Check whether an EHR exists without retrieving it."""
+        return await self.ehrs.ehr_exists(ehr_id)
+    
+    async def get_ehrs(self, ehr_ids, format_type=None, return_exceptions=False):
+        """Get several EHRs concurrently, returning results in order."""
+        return await self.ehrs.get_ehrs(ehr_ids, format_type, return_exceptions)
+    
     async def get_ehr_by_subject_id(self, subject_id, subject_namespace, format_type=None):
         """
         Get an EHR by subject ID and namespace.
@@ -105,9 +176,47 @@ class EHRbaseClient:
             format_type: Format type for the response (optional, uses configuration if not provided)
             
         Returns:
-            The EHR matching the subject criteria
+            The EHR matching the subject criteria. Results are memoized per subject
+            for up to SUBJECT_CACHE_TTL seconds, or until the EHR is updated or
+            deleted through this client.
+        """
+        cache_key = (subject_id, subject_namespace, format_type)
+        ehr = self._subject_cache.get(cache_key)
+        if ehr is not None:
+            self.logger.info("Subject cache hit for %s in namespace %s", subject_id, subject_namespace)
+            return ehr
+        
+        generation = self._subject_cache_generation
+        ehr = await self.ehrs.get_ehr_by_subject_id(subject_id, subject_namespace, format_type)
+        
+        # Skip caching if an EHR was updated or deleted while the lookup was in flight
+        if self._extract_ehr_id(ehr) and generation == self._subject_cache_generation:
+            self._subject_cache[cache_key] = ehr
+        return ehr
+    
+    def clear_subject_cache(self, ehr_id=None):
+        """
+        Clear memoized subject lookups.
+        
+        Args:
+            ehr_id: Only drop entries resolving to this EHR ID (default: drop all)
         """
-        return await self.ehrs.get_ehr_by_subject_id(subject_id, subject_namespace, format_type)
+        self._subject_cache_generation += 1
+        if ehr_id is None:
+            self._subject_cache.clear()
+            return
+        
+        for cache_key, ehr in list(self._subject_cache.items()):
+            if self._extract_ehr_id(ehr) == ehr_id:
+                del self._subject_cache[cache_key]
+    
+    @staticmethod
+    def _extract_ehr_id(ehr):
+        """Extract the EHR ID value from an EHR response, or None."""
+        if isinstance(ehr, dict):
+            ehr_id = ehr.get("ehr_id")
+            return ehr_id.get("value") if isinstance(ehr_id, dict) else ehr_id
+        return None
     
     async def get_ehr_status(self, ehr_id, format_type=None):
         """Get the status of an EHR."""
@@ -115,7 +224,13 @@ class EHRbaseClient:
     
     async def update_ehr_status(self, ehr_id, status_data, version_uid=None, format_type=None):
         """Update the status of an EHR with the required version UID."""
-        return await self.ehrs.update_ehr_status(ehr_id, status_data, version_uid, format_type)
+        # The subject of the EHR may change with its status. The cache is cleared once
+        # the request has completed (or failed), so lookups running meanwhile cannot
+        # cache the old subject again.
+        try:
+            return await self.ehrs.update_ehr_status(ehr_id, status_data, version_uid, format_type)
+        finally:
+            self.clear_subject_cache(ehr_id)
     
     async def delete_ehr(self, ehr_id):
         """
@@ -124,7 +239,10 @@ class EHRbaseClient:
         This method uses the admin endpoint which requires admin privileges.
         It's primarily intended for testing and cleanup purposes.
         """
-        return await self.ehrs.delete_ehr(ehr_id)
+        try:
+            return await self.ehrs.delete_ehr(ehr_id)
+        finally:
+            self.clear_subject_cache(ehr_id)
 
     # Query operations - delegated to query client
     
@@ -141,3 +259,49 @@ class EHRbaseClient:
             The query results
         """
         return await self.queries.execute_adhoc_query(query, query_parameters, format_type)
+    
+    def execute_adhoc_query_stream(self, query, query_parameters=None):
+        """
+        Execute an ad-hoc AQL query and asynchronously iterate over its result rows.
+        
+        Usage: async for row in client.execute_adhoc_query_stream(query): ...
+        """
+        return self.queries.execute_adhoc_query_stream(query, query_parameters)
+    
+    async def store_query(self, qualified_query_name, query, version=None):
+        """
+        Store an AQL query on the EHRbase server under a qualified name.
+        
+        Args:
+            qualified_query_name: The name to store the query under (namespace::name)
+            query: The AQL query string to store
+            version: Optional version of the stored query
+            
+        Returns:
+            The server response for the stored query definition
+        """
+        return await self.queries.store_query(qualified_query_name, query, version)
+    
+    async def execute_stored_query(self, qualified_query_name, query_parameters=None, version=None, format_type=None):
+        """
+        Execute a stored AQL query against the EHRbase server.
+        
+        Args:
+            qualified_query_name: The name the query was stored under (namespace::name)
+            query_parameters: Optional parameters for the query
+            version: Optional version of the stored query (default: the latest)
+            format_type: Format type for the response (optional, uses configuration if not provided)
+            
+        Returns:
+            The query results
+        """
+        return await self.queries.execute_stored_query(qualified_query_name, query_parameters, version, format_type)
+    
+    async def delete_stored_query(self, qualified_query_name, version):
+        """
+        Delete a version of a stored AQL query using the admin API.
+        
+        This method uses the admin endpoint which requires admin privileges.
+        It's primarily intended for testing and cleanup purposes.
+        """
+        return await self.queries.delete_stored_query(qualified_query_name, version)
@@ -3,17 +3,76 @@ Composition operations client for the EHRbase API.
 
 This module provides specialized client functionality for composition operations:
 - Creating compositions
-- Retrieving compositions
+- Retrieving compositions (individually or several at once)
 - Updating compositions
 - Deleting compositions
+- Creating compositions in bulk, or in batches coalesced across concurrent callers
 """
-from utils.logging_utils import get_logger
+import asyncio
+import logging
+from collections import Counter
+from ehrbase.utils.logging_utils import get_logger
 from .http_client import EHRbaseHttpClient
 from .format_config import FormatConfig
 
+# REST path prefix for EHR-scoped resources. Paths are built with f-strings, which
+# are cheaper than str.format or str.join for the handful of segments used here.
+EHR_PATH = "openehr/v1/ehr"
+
+def extract_template_id(composition_data, format_type="flat_json"):
+    """
+    Extract the template ID from flat JSON composition data.
+    
+    The template ID is the first path segment of any key (before the first '/').
+    Other formats do not encode the template ID in their keys, so they are skipped.
+    
+    Only the first key is inspected, so this is constant time regardless of the
+    composition size. The result is deliberately not memoized on the dict: a
+    hidden key would be sent to EHRbase, and dicts cannot be weakly referenced.
+    Callers that repeat writes of the same composition should pass template_id.
+    
+    Args:
+        composition_data: The composition data
+        format_type: Format type of the composition data
+        
+    Returns:
+        The extracted template ID or None
+    """
+    if format_type == "flat_json" and isinstance(composition_data, dict) and composition_data:
+        first_key = next(iter(composition_data))
+        template_id, separator, _ = first_key.partition('/')
+        if separator:
+            return template_id
+    return None
+
+def _split_body(composition_data):
+    """
+    Split composition data into the json_data and content arguments of a request.
+    
+    Pre-encoded JSON (bytes) is sent as is, so callers that send the same
+    composition repeatedly can serialize it once.
+    
+    Args:
+        composition_data: The composition data, or its JSON encoding as bytes
+        
+    Returns:
+        Tuple of (json_data, content)
+    """
+    if isinstance(composition_data, bytes):
+        return None, composition_data
+    return composition_data, None
+
 class CompositionClient:
     """Client for composition-related operations against the EHRbase API."""
     
+    # Maximum number of composition requests in flight for bulk operations
+    BULK_CONCURRENCY = 16
+    
+    # Default flush policy for create_compositions_batched: a batch is sent when it
+    # holds BATCH_MAX_SIZE compositions or BATCH_MAX_WAIT_MS after its first one arrived
+    BATCH_MAX_SIZE = 100
+    BATCH_MAX_WAIT_MS = 20
+    
     def __init__(self, http_client=None, format_config=None):
         """
         Initialize the Composition Client.
@@ -21,30 +80,31 @@ class CompositionClient:
         Args:
             http_client: An optional EHRbaseHttpClient instance for making HTTP requests.
             format_config: Configuration for JSON format modes
-                         If not provided, a new instance will be created.
+                         If not provided, the shared FormatConfig.default() is used.
         """
         self.logger = get_logger("composition_client")
         self.http_client = http_client or EHRbaseHttpClient()
-        self.format_config = format_config or FormatConfig()
+        self.format_config = format_config or FormatConfig.default()
+        
+        # Open batches keyed by (ehr_id, format_type), and batches being sent
+        self._pending_batches = {}
+        self._batch_tasks = set()
     
-    def _extract_template_id(self, composition_data):
+    def _extract_template_id(self, composition_data, format_type):
         """
         Extract template ID from composition data.
         
         Args:
             composition_data: The composition data
+            format_type: Format type of the composition data
             
         Returns:
             The extracted template ID or None
         """
-        if isinstance(composition_data, dict) and composition_data:
-            # The template ID is the first part of any key (before the first '/')
-            first_key = next(iter(composition_data.keys()))
-            if '/' in first_key:
-                template_id = first_key.split('/')[0]
-                self.logger.info(f"Extracted template ID from composition data: {template_id}")
-                return template_id
-        return None
+        template_id = extract_template_id(composition_data, format_type)
+        if template_id:
+            self.logger.info("Extracted template ID from composition data: %s", template_id)
+        return template_id
     
     async def create_composition(self, ehr_id, composition_data, format_type=None, template_id=None):
         """
@@ -52,29 +112,167 @@ class CompositionClient:
         
         Args:
             ehr_id: The EHR ID to create the composition in
-            composition_data: The composition data to create
+            composition_data: The composition data to create, or its JSON encoding as bytes
             format_type: Format type for the request/response (default: flat_json)
-            template_id: Optional template ID, will be extracted from composition_data if not provided
+            template_id: Optional template ID, will be extracted from composition_data if not provided.
+                         Pass it when known to skip the extraction (always for bytes).
             
         Returns:
             The created composition response
         """
-        self.logger.info(f"Creating composition in EHR {ehr_id}")
-        
-        # Extract template ID from composition data if not provided
-        template_id = template_id or self._extract_template_id(composition_data)
+        self.logger.info("Creating composition in EHR %s", ehr_id)
         
         # Get format type from configuration if not provided
         format_type = self.format_config.get_composition_format(format_type)
         
+        # Extract template ID from composition data only if the caller did not provide it
+        if not template_id:
+            template_id = self._extract_template_id(composition_data, format_type)
+        
+        json_data, content = _split_body(composition_data)
         return await self.http_client.request(
-            f"openehr/v1/ehr/{ehr_id}/composition",
+            f"{EHR_PATH}/{ehr_id}/composition",
             method="POST",
-            json_data=composition_data,
+            json_data=json_data,
+            content=content,
             format_type=format_type,
             template_id=template_id
         )
     
+    async def create_compositions_bulk(self, ehr_id, compositions, format_type=None, return_exceptions=False, template_id=None):
+        """
+        Create several compositions in the same EHR concurrently.
+        
+        EHRbase has no multi-composition endpoint for flat formats, so the POSTs are
+        pipelined over the shared HTTP session, bounded by BULK_CONCURRENCY.
+        
+        Args:
+            ehr_id: The EHR ID to create the compositions in
+            compositions: List of composition data to create
+            format_type: Format type for the request/response (default: flat_json)
+            return_exceptions: If True, failed creations are returned as exceptions in
+                               the results instead of raising the first failure
+            template_id: Optional template ID shared by all compositions; extracted
+                         per composition if not provided
+            
+        Returns:
+            The creation responses, in the same order as compositions
+        """
+        # Resolve template IDs in one pass so each request skips the extraction
+        format_type = self.format_config.get_composition_format(format_type)
+        if template_id:
+            template_ids = [template_id] * len(compositions)
+        else:
+            template_ids = [extract_template_id(composition_data, format_type) for composition_data in compositions]
+        if self.logger.isEnabledFor(logging.INFO):
+            self.logger.info("Creating %s compositions in EHR %s across templates: %s", len(compositions), ehr_id, dict(Counter(template_ids)))
+        
+        return await self._create_many(ehr_id, compositions, template_ids, format_type, return_exceptions)
+    
+    async def _create_many(self, ehr_id, compositions, template_ids, format_type, return_exceptions):
+        """Issue one bounded-concurrency POST per composition over the shared session."""
+        semaphore = asyncio.Semaphore(self.BULK_CONCURRENCY)
+        
+        async def create(composition_data, composition_template_id):
+            async with semaphore:
+                return await self.create_composition(ehr_id, composition_data, format_type, composition_template_id)
+        
+        return await asyncio.gather(
+            *(create(composition_data, composition_template_id) for composition_data, composition_template_id in zip(compositions, template_ids)),
+            return_exceptions=return_exceptions
+        )
+    
+    async def create_compositions_batched(self, ehr_id, compositions, format_type=None, template_id=None, max_batch=None, max_wait_ms=None, return_exceptions=False):
+        """
+        Queue compositions for creation, coalescing concurrent callers into shared batches.
+        
+        Compositions for the same EHR and format are collected until the batch holds
+        max_batch items or max_wait_ms has passed since it was opened, then sent
+        together. EHRbase has no multi-composition endpoint for flat formats, so a
+        batch is sent as pipelined POSTs (see create_compositions_bulk): batching
+        saves no round trips and adds up to max_wait_ms of latency. It is meant for
+        many concurrent callers writing small numbers of compositions, which then
+        share one bounded set of requests instead of each opening their own.
+        
+        Args:
+            ehr_id: The EHR ID to create the compositions in
+            compositions: List of composition data to create
+            format_type: Format type for the request/response (default: flat_json)
+            template_id: Optional template ID shared by these compositions; extracted
+                         per composition if not provided
+            max_batch: Maximum batch size (default: BATCH_MAX_SIZE)
+            max_wait_ms: Maximum time a batch stays open, in milliseconds (default: BATCH_MAX_WAIT_MS)
+            return_exceptions: If True, failed creations are returned as exceptions in
+                               the results instead of raising the first failure
+            
+        Returns:
+            The creation responses, in the same order as compositions
+        """
+        format_type = self.format_config.get_composition_format(format_type)
+        max_batch = max_batch or self.BATCH_MAX_SIZE
+        max_wait_ms = self.BATCH_MAX_WAIT_MS if max_wait_ms is None else max_wait_ms
+        
+        # Resolve every template ID before queuing, so a failure here leaves no
+        # queued compositions behind without a caller waiting for them
+        if template_id:
+            template_ids = [template_id] * len(compositions)
+        else:
+            template_ids = [extract_template_id(composition_data, format_type) for composition_data in compositions]
+        
+        loop = asyncio.get_running_loop()
+        key = (ehr_id, format_type)
+        futures = []
+        for composition_data, composition_template_id in zip(compositions, template_ids):
+            batch = self._pending_batches.get(key)
+            if batch is None:
+                batch = self._pending_batches[key] = []
+                loop.call_later(max_wait_ms / 1000, self._flush_batch, key, batch)
+            
+            future = loop.create_future()
+            batch.append((composition_data, composition_template_id, future))
+            futures.append(future)
+            
+            if len(batch) >= max_batch:
+                self._flush_batch(key, batch)
+        
+        # Wait for every result, so a failure does not leave the others unretrieved
+        results = await asyncio.gather(*futures, return_exceptions=True)
+        if not return_exceptions:
+            for result in results:
+                if isinstance(result, BaseException):
+                    raise result
+        return results
+    
+    def _flush_batch(self, key, batch):
+        """Close an open batch and start sending it (no-op if it was already flushed)."""
+        if self._pending_batches.get(key) is not batch:
+            return
+        del self._pending_batches[key]
+        
+        task = asyncio.ensure_future(self._send_batch(key, batch))
+        self._batch_tasks.add(task)
+        task.add_done_callback(self._batch_tasks.discard)
+    
+    async def _send_batch(self, key, batch):
+        """Send a closed batch and resolve each caller's future with its own result."""
+        ehr_id, format_type = key
+        self.logger.info("Flushing batch of %s compositions for EHR %s", len(batch), ehr_id)
+        
+        compositions = [composition_data for composition_data, _, _ in batch]
+        template_ids = [template_id for _, template_id, _ in batch]
+        try:
+            results = await self._create_many(ehr_id, compositions, template_ids, format_type, return_exceptions=True)
+        except Exception as e:
+            results = [e] * len(batch)
+        
+        for (_, _, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+    
     async def get_composition(self, ehr_id, composition_uid, format_type=None):
         """
         Get a composition by its UID.
@@ -87,16 +285,47 @@ class CompositionClient:
         Returns:
             The composition data
         """
-        self.logger.info(f"Getting composition {composition_uid} from EHR {ehr_id}")
+        self.logger.info("Getting composition %s from EHR %s", composition_uid, ehr_id)
         
         # Get format type from configuration if not provided
         format_type = self.format_config.get_composition_format(format_type)
         
         return await self.http_client.request(
-            f"openehr/v1/ehr/{ehr_id}/composition/{composition_uid}",
+            f"{EHR_PATH}/{ehr_id}/composition/{composition_uid}",
             format_type=format_type
         )
     
+    async def get_compositions(self, ehr_id, composition_uids, format_type=None, return_exceptions=False):
+        """
+        Get several compositions from the same EHR concurrently.
+        
+        Independent reads should be awaited together rather than one after the
+        other, so the total wait is close to the slowest request instead of the sum.
+        
+        Args:
+            ehr_id: The EHR ID containing the compositions
+            composition_uids: List of composition versioned object UIDs
+            format_type: Format type for the response (default: flat_json)
+            return_exceptions: If True, failed lookups are returned as exceptions in
+                               the results instead of raising the first failure
+            
+        Returns:
+            The composition data, in the same order as composition_uids
+        """
+        self.logger.info("Getting %s compositions from EHR %s", len(composition_uids), ehr_id)
+        
+        format_type = self.format_config.get_composition_format(format_type)
+        semaphore = asyncio.Semaphore(self.BULK_CONCURRENCY)
+        
+        async def get(composition_uid):
+            async with semaphore:
+                return await self.get_composition(ehr_id, composition_uid, format_type)
+        
+        return await asyncio.gather(
+            *(get(composition_uid) for composition_uid in composition_uids),
+            return_exceptions=return_exceptions
+        )
+    
     async def update_composition(self, ehr_id, composition_uid, composition_data, format_type=None, template_id=None):
         """
         Update an existing composition.
@@ -104,32 +333,35 @@ class CompositionClient:
         Args:
             ehr_id: The EHR ID containing the composition
             composition_uid: The composition's versioned object UID
-            composition_data: The updated composition data
+            composition_data: The updated composition data, or its JSON encoding as bytes
             format_type: Format type for the request/response (default: flat_json)
-            template_id: Optional template ID, will be extracted from composition_data if not provided
+            template_id: Optional template ID, will be extracted from composition_data if not provided.
+                         Pass it when known to skip the extraction (always for bytes).
             
         Returns:
             The updated composition response
         """
-        self.logger.info(f"Updating composition {composition_uid} in EHR {ehr_id}")
-        
-        # Extract template ID from composition data if not provided
-        template_id = template_id or self._extract_template_id(composition_data)
+        self.logger.info("Updating composition %s in EHR %s", composition_uid, ehr_id)
         
         # Get format type from configuration if not provided
         format_type = self.format_config.get_composition_format(format_type)
         
+        # Extract template ID from composition data only if the caller did not provide it
+        if not template_id:
+            template_id = self._extract_template_id(composition_data, format_type)
+        
         # Extract the versioned_object_uid (the part before the first ::)
         # This is needed for the URL path
-        versioned_object_uid = composition_uid
-        if "::" in composition_uid:
-            versioned_object_uid = composition_uid.split("::")[0]
-            self.logger.info(f"Extracted versioned_object_uid: {versioned_object_uid}")
+        versioned_object_uid, separator, _ = composition_uid.partition("::")
+        if separator:
+            self.logger.info("Extracted versioned_object_uid: %s", versioned_object_uid)
         
+        json_data, content = _split_body(composition_data)
         return await self.http_client.request(
-            f"openehr/v1/ehr/{ehr_id}/composition/{versioned_object_uid}",  # Use versioned_object_uid in URL path
+            f"{EHR_PATH}/{ehr_id}/composition/{versioned_object_uid}",  # Use versioned_object_uid in URL path
             method="PUT",
-            json_data=composition_data,
+            json_data=json_data,
+            content=content,
             format_type=format_type,
             template_id=template_id,
             version_uid=composition_uid  # Pass the full composition_uid as version_uid for If-Match header
@@ -147,7 +379,7 @@ class CompositionClient:
         Returns:
             Success status
         """
-        self.logger.info(f"Deleting composition {composition_uid} from EHR {ehr_id}")
+        self.logger.info("Deleting composition %s from EHR %s", composition_uid, ehr_id)
         
         # Get format type from configuration if not provided
         format_type = self.format_config.get_composition_format(format_type)
@@ -155,7 +387,7 @@ class CompositionClient:
         # For delete operations, we always use JSON format regardless of configuration
         format_type = "json" if format_type is None else format_type
         return await self.http_client.request(
-            f"openehr/v1/ehr/{ehr_id}/composition/{composition_uid}",
+            f"{EHR_PATH}/{ehr_id}/composition/{composition_uid}",
             method="DELETE",
             format_type=format_type
         )
@@ -3,17 +3,39 @@ EHR operations client for the EHRbase API.
 
 This module provides specialized client functionality for EHR operations:
 - Creating EHRs
-- Retrieving EHRs
+- Retrieving EHRs (individually or several at once)
+- Checking whether an EHR exists
 - Listing EHRs
 - Managing EHR status
 """
-from utils.logging_utils import get_logger
+import asyncio
+import httpx
+from ehrbase.utils.logging_utils import get_logger
 from .http_client import EHRbaseHttpClient
 from .format_config import FormatConfig
 
+# REST path prefixes for EHR resources
+EHR_PATH = "openehr/v1/ehr"
+ADMIN_EHR_PATH = "admin/ehr"
+
+class EHRNotFoundError(httpx.HTTPStatusError):
+    """
+    Raised when EHRbase answers 404 for an EHR.
+    
+    Subclasses httpx.HTTPStatusError, so callers that handle HTTP errors
+    generically keep working; the response is available as .response.
+    """
+    
+    def __init__(self, ehr_id, error):
+        super().__init__(str(error), request=error.request, response=error.response)
+        self.ehr_id = ehr_id
+
 class EHRClient:
     """Client for EHR-related operations against the EHRbase API."""
     
+    # Maximum number of EHR requests in flight for bulk operations
+    BULK_CONCURRENCY = 16
+    
     def __init__(self, http_client=None, format_config=None):
         """
         Initialize the EHR Client.
@@ -21,18 +43,18 @@ class EHRClient:
         Args:
             http_client: An optional EHRbaseHttpClient instance for making HTTP requests.
             format_config: Configuration for JSON format modes
-                         If not provided, a new instance will be created.
+                         If not provided, the shared FormatConfig.default() is used.
         """
         self.logger = get_logger("ehr_client")
         self.http_client = http_client or EHRbaseHttpClient()
-        self.format_config = format_config or FormatConfig()
+        self.format_config = format_config or FormatConfig.default()
     
     async def create_ehr(self, ehr_status=None, format_type=None):
         """
         Create a new EHR in the system.
         
         Args:
-            ehr_status: Optional EHR status document as a dict
+            ehr_status: Optional EHR status document as a dict, or already serialized JSON bytes
             format_type: Format type for the response (optional, uses configuration if not provided)
             
         Returns:
@@ -43,9 +65,18 @@ class EHRClient:
         # Get format type from configuration if not provided
         format_type = self.format_config.get_ehr_format(format_type)
         
+        # Send pre-serialized documents as-is instead of encoding them again
+        if isinstance(ehr_status, bytes):
+            return await self.http_client.request(
+                EHR_PATH,
+                method="POST",
+                content=ehr_status,
+                format_type=format_type
+            )
+        
         # POST to /openehr/v1/ehr endpoint
         return await self.http_client.request(
-            "openehr/v1/ehr",
+            EHR_PATH,
             method="POST",
             json_data=ehr_status,
             format_type=format_type
@@ -61,16 +92,69 @@ class EHRClient:
             
         Returns:
             The EHR data
+            
+        Raises:
+            EHRNotFoundError: If no EHR with this ID exists
         """
-        self.logger.info(f"Retrieving EHR {ehr_id}")
+        self.logger.info("Retrieving EHR %s", ehr_id)
         
         # Get format type from configuration if not provided
         format_type = self.format_config.get_ehr_format(format_type)
         
         # GET to /openehr/v1/ehr/{ehr_id} endpoint
-        return await self.http_client.request(
-            f"openehr/v1/ehr/{ehr_id}",
-            format_type=format_type
+        try:
+            return await self.http_client.request(
+                f"{EHR_PATH}/{ehr_id}",
+                format_type=format_type
+            )
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 404:
+                raise EHRNotFoundError(ehr_id, e) from None
+            raise
+    
+    async def ehr_exists(self, ehr_id):
+        """
+        Check whether an EHR exists without retrieving it.
+        
+        Args:
+            ehr_id: The ID of the EHR to check
+            
+        Returns:
+            True if the EHR exists, False otherwise
+        """
+        # HEAD to /openehr/v1/ehr/{ehr_id} endpoint
+        return await self.http_client.exists(f"{EHR_PATH}/{ehr_id}")
+    
+    async def get_ehrs(self, ehr_ids, format_type=None, return_exceptions=False):
+        """
+        Get several EHRs concurrently.
+        
+        Independent lookups are awaited together, e.g. an EHR and its status:
+        
+            ehr, status = await asyncio.gather(
+                ehr_client.get_ehr(ehr_id), ehr_client.get_ehr_status(ehr_id))
+        
+        Args:
+            ehr_ids: List of EHR IDs to retrieve
+            format_type: Format type for the response (optional, uses configuration if not provided)
+            return_exceptions: If True, failed lookups are returned as exceptions in
+                               the results instead of raising the first failure
+            
+        Returns:
+            The EHR data, in the same order as ehr_ids
+        """
+        self.logger.info("Retrieving %s EHRs", len(ehr_ids))
+        
+        format_type = self.format_config.get_ehr_format(format_type)
+        semaphore = asyncio.Semaphore(self.BULK_CONCURRENCY)
+        
+        async def get(ehr_id):
+            async with semaphore:
+                return await self.get_ehr(ehr_id, format_type)
+        
+        return await asyncio.gather(
+            *(get(ehr_id) for ehr_id in ehr_ids),
+            return_exceptions=return_exceptions
         )
     
     async def get_ehr_by_subject_id(self, subject_id, subject_namespace, format_type=None):
@@ -88,15 +172,14 @@ class EHRClient:
         Returns:
             The EHR matching the subject criteria
         """
-        self.logger.info(f"Retrieving EHR by subject ID {subject_id} in namespace {subject_namespace}")
+        self.logger.info("Retrieving EHR by subject ID %s in namespace %s", subject_id, subject_namespace)
         
         # Get format type from configuration if not provided
         format_type = self.format_config.get_ehr_format(format_type)
         
         if not subject_id or not subject_namespace:
             raise ValueError("Both subject_id and subject_namespace are required")
-            
-        self.logger.info(f"Getting EHR for subject {subject_id} in namespace {subject_namespace}")
+        
         params = {
             "subject_id": subject_id,
             "subject_namespace": subject_namespace
@@ -104,7 +187,7 @@ class EHRClient:
         
         # GET to /openehr/v1/ehr endpoint with subject query parameters
         return await self.http_client.request(
-            "openehr/v1/ehr",
+            EHR_PATH,
             params=params,
             format_type=format_type
         )
@@ -120,14 +203,14 @@ class EHRClient:
         Returns:
             The EHR status data
         """
-        self.logger.info(f"Retrieving status for EHR {ehr_id}")
+        self.logger.info("Retrieving status for EHR %s", ehr_id)
         
         # Get format type from configuration if not provided
         format_type = self.format_config.get_ehr_format(format_type)
         
         # GET to /openehr/v1/ehr/{ehr_id}/ehr_status endpoint
         return await self.http_client.request(
-            f"openehr/v1/ehr/{ehr_id}/ehr_status",
+            f"{EHR_PATH}/{ehr_id}/ehr_status",
             format_type=format_type
         )
     
@@ -144,7 +227,7 @@ class EHRClient:
         Returns:
             The updated EHR status data
         """
-        self.logger.info(f"Updating status for EHR {ehr_id}")
+        self.logger.info("Updating status for EHR %s", ehr_id)
         
         # Get format type from configuration if not provided
         format_type = self.format_config.get_ehr_format(format_type)
@@ -152,14 +235,14 @@ class EHRClient:
         # If version_uid is not provided, try to extract it from the status_data
         if not version_uid and status_data and "uid" in status_data:
             version_uid = status_data["uid"]["value"]
-            self.logger.info(f"Extracted version UID from status data: {version_uid}")
+            self.logger.info("Extracted version UID from status data: %s", version_uid)
         
         if not version_uid:
             raise ValueError("Version UID is required for updating EHR status")
         
         # PUT to /openehr/v1/ehr/{ehr_id}/ehr_status endpoint with If-Match header
         return await self.http_client.request(
-            f"openehr/v1/ehr/{ehr_id}/ehr_status",
+            f"{EHR_PATH}/{ehr_id}/ehr_status",
             method="PUT",
             json_data=status_data,
             version_uid=version_uid,
@@ -179,15 +262,15 @@ class EHRClient:
         Returns:
             True if deletion was successful, False otherwise
         """
-        self.logger.info(f"Deleting EHR with ID {ehr_id} using admin API")
+        self.logger.info("Deleting EHR with ID %s using admin API", ehr_id)
         
         # DELETE to /admin/ehr/{ehr_id} endpoint
         try:
-            response = await self.http_client.request(
-                f"admin/ehr/{ehr_id}",
+            await self.http_client.request(
+                f"{ADMIN_EHR_PATH}/{ehr_id}",
                 method="DELETE"
             )
             return True
         except Exception as e:
-            self.logger.error(f"Failed to delete EHR {ehr_id}: {str(e)}")
+            self.logger.error("Failed to delete EHR %s: %s", ehr_id, e)
             return False
@@ -5,7 +5,18 @@ This module provides configuration for JSON format modes in the EHRbase client,
 supporting different serialization formats as specified in the openEHR specification.
 """
 import os
-from utils.logging_utils import get_logger
+from functools import lru_cache
+from ehrbase.utils.logging_utils import get_logger
+
+@lru_cache(maxsize=None)
+def _env_json_format():
+    """
+    Read EHRBASE_JSON_FORMAT once per process.
+    
+    The lookup is deferred to the first FormatConfig created without an explicit
+    mode, so a .env file loaded at startup is still honoured.
+    """
+    return os.environ.get("EHRBASE_JSON_FORMAT")
 
 class FormatConfig:
     """
@@ -15,16 +26,37 @@ class FormatConfig:
     - canonical: Uses application/json consistently
     - wt_flat: Uses web template format for templates and flat JSON for compositions
     - wt_structured: Uses web template format for templates and structured JSON for compositions
+    
+    Instances are immutable after initialization. Clients created without an explicit
+    configuration share the one returned by FormatConfig.default().
     """
     
+    __slots__ = ("logger", "json_format", "_composition_format", "_template_format")
+    
+    # Shared configuration for the environment-selected mode, see default()
+    _default = None
+    
     # Available JSON format modes
     CANONICAL = "canonical"
     WT_FLAT = "wt_flat"
     WT_STRUCTURED = "wt_structured"
+    JSON_FORMATS = frozenset({CANONICAL, WT_FLAT, WT_STRUCTURED})
     
     # Default format mode
     DEFAULT_FORMAT = WT_FLAT
     
+    # Format types used for compositions and templates in each mode
+    COMPOSITION_FORMATS = {
+        CANONICAL: "json",
+        WT_FLAT: "flat_json",
+        WT_STRUCTURED: "structured_json"
+    }
+    TEMPLATE_FORMATS = {
+        CANONICAL: "json",
+        WT_FLAT: "web_template",  # Both wt_flat and wt_structured use the same template format
+        WT_STRUCTURED: "web_template"
+    }
+    
     def __init__(self, json_format=None):
         """
         Initialize with the specified JSON format or default.
@@ -39,14 +71,30 @@ class FormatConfig:
         if json_format:
             self.json_format = json_format
         else:
-            env_format = os.environ.get("EHRBASE_JSON_FORMAT")
-            if env_format in [self.CANONICAL, self.WT_FLAT, self.WT_STRUCTURED]:
+            env_format = _env_json_format()
+            if env_format in self.JSON_FORMATS:
                 self.json_format = env_format
             else:
                 self.json_format = self.DEFAULT_FORMAT
         
+        # The mode is fixed after initialization, so resolve the per-operation formats once
+        self._composition_format = self.COMPOSITION_FORMATS.get(self.json_format, "flat_json")
+        self._template_format = self.TEMPLATE_FORMATS.get(self.json_format, "web_template")
+        
         self.logger.info(f"Using JSON format mode: {self.json_format}")
     
+    @classmethod
+    def default(cls):
+        """
+        Get the shared configuration for the mode selected by EHRBASE_JSON_FORMAT.
+        
+        The instance is created on first use, so the environment (e.g. a .env file)
+        is read when the first client is created rather than at import time.
+        """
+        if cls._default is None:
+            cls._default = cls()
+        return cls._default
+    
     def get_template_list_format(self, override_format=None):
         """
         Get the appropriate format type for template listing operations.
@@ -57,11 +105,8 @@ class FormatConfig:
         Returns:
             The format type string to use
         """
-        if override_format:
-            return override_format
-            
         # Template listing always uses json format regardless of the mode
-        return "json"
+        return override_format or "json"
     
     def get_template_format(self, override_format=None):
         """
@@ -73,13 +118,7 @@ class FormatConfig:
         Returns:
             The format type string to use
         """
-        if override_format:
-            return override_format
-            
-        if self.json_format == self.CANONICAL:
-            return "json"
-        else:  # Both wt_flat and wt_structured use the same template format
-            return "web_template"
+        return override_format or self._template_format
     
     def get_composition_format(self, override_format=None):
         """
@@ -91,16 +130,7 @@ class FormatConfig:
         Returns:
             The format type string to use
         """
-        if override_format:
-            return override_format
-            
-        if self.json_format == self.CANONICAL:
-            return "json"
-        elif self.json_format == self.WT_FLAT:
-            return "flat_json"
-        elif self.json_format == self.WT_STRUCTURED:
-            return "structured_json"
-        return "flat_json"  # Default
+        return override_format or self._composition_format
     
     def get_ehr_format(self, override_format=None):
         """
@@ -112,9 +142,7 @@ class FormatConfig:
         Returns:
             The format type string to use
         """
-        if override_format:
-            return override_format
-        return "json"  # Always json for EHR operations
+        return override_format or "json"  # Always json for EHR operations
     
     def get_query_format(self, override_format=None):
         """
@@ -126,6 +154,4 @@ class FormatConfig:
         Returns:
             The format type string to use
         """
-        if override_format:
-            return override_format
-        return "json"  # Always json for query operations
+        return override_format or "json"  # Always json for query operations
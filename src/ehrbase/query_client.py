@@ -2,12 +2,15 @@
 EHRbase Query Client
 
 This module provides a client for executing AQL queries against the EHRbase server.
-It supports ad-hoc queries with optional parameters.
+It supports ad-hoc queries with optional parameters, either returning the full
+result set or streaming its rows, and stored queries that the server parses once
+and then executes by name.
 """
-import json
 from typing import Dict, Any, Optional
 
-from utils.logging_utils import get_logger
+import orjson
+
+from ehrbase.utils.logging_utils import get_logger
 from ehrbase.http_client import EHRbaseHttpClient
 from ehrbase.format_config import FormatConfig
 
@@ -16,6 +19,16 @@ class QueryClient:
     Client for executing AQL queries against the EHRbase server.
     """
     
+    # Query parameters are often UUIDs, datetimes or numeric arrays; orjson encodes
+    # these natively, and naive datetimes are sent as UTC
+    PAYLOAD_JSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_NAIVE_UTC | orjson.OPT_SERIALIZE_NUMPY
+    
+    # Stored query definitions are sent as plain AQL text
+    STORED_QUERY_HEADERS = {"Content-Type": "text/plain"}
+    
+    # Admin API path for removing stored queries
+    ADMIN_QUERY_PATH = "admin/query"
+    
     def __init__(self, http_client: EHRbaseHttpClient, format_config=None):
         """
         Initialize the query client with an HTTP client.
@@ -26,25 +39,22 @@ class QueryClient:
         """
         self.logger = get_logger("query_client")
         self.http_client = http_client
-        self.format_config = format_config or FormatConfig()
+        self.format_config = format_config or FormatConfig.default()
+        
+        # FormatConfig is immutable, so resolve the default format once
+        self._query_format = self.format_config.get_query_format()
     
-    async def execute_adhoc_query(self, query: str, query_parameters: Optional[Dict[str, Any]] = None, format_type: str = None):
+    def _encode_payload(self, query, query_parameters):
         """
-        Execute an ad-hoc AQL query against the EHRbase server.
+        Build and serialize the AQL request body.
         
         Args:
-            query: The AQL query string to execute
+            query: The AQL query string
             query_parameters: Optional parameters for the query
-            format_type: Format type for the response (optional, uses configuration if not provided)
             
         Returns:
-            The query results
+            The JSON-encoded payload as bytes
         """
-        self.logger.info(f"Executing ad-hoc query: {query[:100]}...")
-        
-        # Get format type from configuration if not provided
-        format_type = self.format_config.get_query_format(format_type)
-        
         # Create the query payload
         payload = {
             "q": query
@@ -55,10 +65,142 @@ class QueryClient:
             self.logger.info(f"With parameters: {query_parameters}")
             payload["query_parameters"] = query_parameters
         
+        return orjson.dumps(payload, option=self.PAYLOAD_JSON_OPTIONS)
+    
+    async def execute_adhoc_query(self, query: str, query_parameters: Optional[Dict[str, Any]] = None, format_type: str = None):
+        """
+        Execute an ad-hoc AQL query against the EHRbase server.
+        
+        Args:
+            query: The AQL query string to execute
+            query_parameters: Optional parameters for the query
+            format_type: Format type for the response (optional, uses configuration if not provided)
+            
+        Returns:
+            The query results
+        """
+        self.logger.info(f"Executing ad-hoc query: {query[:100]}...")
+        
+        # Get format type from configuration if not provided
+        format_type = format_type or self._query_format
+        
         # POST to /openehr/v1/query/aql endpoint
         return await self.http_client.request(
             "openehr/v1/query/aql",
             method="POST",
-            json_data=payload,
+            content=self._encode_payload(query, query_parameters),
+            format_type=format_type
+        )
+    
+    async def execute_adhoc_query_stream(self, query: str, query_parameters: Optional[Dict[str, Any]] = None):
+        """
+        Execute an ad-hoc AQL query and yield result rows as they arrive.
+        
+        The response is parsed incrementally with ijson, so memory use is bounded by
+        the largest row rather than the whole result set, and the first rows are
+        available before the server has finished sending.
+        
+        Args:
+            query: The AQL query string to execute
+            query_parameters: Optional parameters for the query
+            
+        Yields:
+            Each row of the result set (a list of column values)
+        """
+        self.logger.info(f"Streaming ad-hoc query: {query[:100]}...")
+        
+        # Streaming requires the canonical JSON result set, so the format is fixed
+        async for row in self.http_client.stream_items(
+            "openehr/v1/query/aql",
+            "rows.item",
+            method="POST",
+            content=self._encode_payload(query, query_parameters),
+            format_type="json"
+        ):
+            yield row
+    
+    @staticmethod
+    def _stored_query_path(prefix, qualified_query_name, version):
+        """Build the path of a stored query, optionally pinned to a version."""
+        path = f"{prefix}/{qualified_query_name}"
+        return f"{path}/{version}" if version else path
+    
+    async def store_query(self, qualified_query_name: str, query: str, version: Optional[str] = None):
+        """
+        Store an AQL query on the EHRbase server under a qualified name.
+        
+        The server parses the query once when it is stored, so repeated executions
+        with execute_stored_query() skip parsing the AQL again.
+        
+        Args:
+            qualified_query_name: The name to store the query under (namespace::name)
+            query: The AQL query string to store
+            version: Optional version of the stored query (e.g. "1.0.0")
+            
+        Returns:
+            The server response for the stored query definition
+        """
+        self.logger.info(f"Storing query {qualified_query_name}: {query[:100]}...")
+        
+        # PUT to /openehr/v1/definition/query/{qualified_query_name}[/{version}]
+        return await self.http_client.request(
+            self._stored_query_path("openehr/v1/definition/query", qualified_query_name, version),
+            method="PUT",
+            content=query,
+            headers=self.STORED_QUERY_HEADERS
+        )
+    
+    async def execute_stored_query(self, qualified_query_name: str, query_parameters: Optional[Dict[str, Any]] = None, version: Optional[str] = None, format_type: str = None):
+        """
+        Execute a stored AQL query against the EHRbase server.
+        
+        Args:
+            qualified_query_name: The name the query was stored under (namespace::name)
+            query_parameters: Optional parameters for the query
+            version: Optional version of the stored query (default: the latest)
+            format_type: Format type for the response (optional, uses configuration if not provided)
+            
+        Returns:
+            The query results
+        """
+        self.logger.info(f"Executing stored query: {qualified_query_name}")
+        
+        # Get format type from configuration if not provided
+        format_type = format_type or self._query_format
+        
+        payload = {"query_parameters": query_parameters} if query_parameters else {}
+        
+        # POST to /openehr/v1/query/{qualified_query_name}[/{version}] endpoint
+        return await self.http_client.request(
+            self._stored_query_path("openehr/v1/query", qualified_query_name, version),
+            method="POST",
+            content=orjson.dumps(payload, option=self.PAYLOAD_JSON_OPTIONS),
             format_type=format_type
         )
+    
+    async def delete_stored_query(self, qualified_query_name: str, version: str):
+        """
+        Delete a version of a stored AQL query using the admin API.
+        
+        This method uses the admin endpoint which requires admin privileges.
+        It's primarily intended for testing and cleanup purposes.
+        
+        Args:
+            qualified_query_name: The name the query was stored under (namespace::name)
+            version: The version of the stored query to delete
+            
+        Returns:
+            True if deletion was successful, False otherwise
+        """
+        self.logger.info(f"Deleting stored query {qualified_query_name}/{version} using admin API")
+        
+        # DELETE to /admin/query/{qualified_query_name}/{version} endpoint
+        try:
+            await self.http_client.request(
+                self._stored_query_path(self.ADMIN_QUERY_PATH, qualified_query_name, version),
+                method="DELETE"
+            )
+            return True
+        except Exception as e:
+            self.logger.error(f"Failed to delete stored query {qualified_query_name}/{version}: {e}")
+            return False
@@ -0,0 +1,26 @@
+"""
+Command line scripts for initializing an EHRbase server.
+
+- create_ehr: Create one or more EHRs
+- upload_template: Upload operational templates
+"""
+import asyncio
+
+def run(main):
+    """
+    Run a script's main coroutine, using uvloop when it is installed.
+    
+    uvloop is an optional dependency (pip install .[fast]) with a faster event loop
+    for the socket-heavy bulk operations these scripts perform.
+    
+    Args:
+        main: The coroutine to run
+        
+    Returns:
+        The result of the coroutine
+    """
+    try:
+        import uvloop
+    except ImportError:
+        return asyncio.run(main)
+    return uvloop.run(main)
@@ -0,0 +1,149 @@
+"""
+Create a new EHR in the EHRbase server.
+
+This script creates a new Electronic Health Record (EHR) in the EHRbase server
+with a specified subject ID or a randomly generated one. With --count, several
+EHRs with random subject IDs are created over the same HTTP session.
+
+Progress is logged to stderr; the ID of each created EHR is written to stdout,
+one per line, so the output can be piped into other tools.
+"""
+import sys
+import argparse
+import logging
+import logging.handlers
+import orjson
+import uuid
+
+from ehrbase.scripts import run
+from ehrbase.client import EHRbaseClient
+from ehrbase.utils.logging_utils import get_logger, LOG_FORMAT
+
+logger = get_logger("create_ehr")
+
+# Buffer progress records and write them in batches rather than once per line
+LOG_BUFFER_CAPACITY = 100
+
+def configure_logging():
+    """Route this script's log records through a buffered stderr handler."""
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    buffer_handler = logging.handlers.MemoryHandler(
+        LOG_BUFFER_CAPACITY,
+        flushLevel=logging.ERROR,
+        target=stream_handler
+    )
+    logger.addHandler(buffer_handler)
+    logger.propagate = False
+    return buffer_handler
+
+# Static part of the EHR status document, shared by every EHR created
+_EHR_STATUS_PROTO = {
+    "_type": "EHR_STATUS",
+    "archetype_node_id": "openEHR-EHR-EHR_STATUS.generic.v1",
+    "name": {
+        "value": "ehr status"
+    },
+    "is_modifiable": "true",
+    "is_queryable": "true"
+}
+
+def build_ehr_status(subject_id, namespace, scheme):
+    """
+    Build an EHR status document for a subject (following test_ehr_client.py approach).
+    
+    Only the subject is allocated per call; all other fields are shared with the prototype.
+    """
+    return {
+        **_EHR_STATUS_PROTO,
+        "subject": {
+            "external_ref": {
+                "id": {
+                    "_type": "GENERIC_ID",
+                    "value": subject_id,
+                    "scheme": scheme
+                },
+                "namespace": namespace,
+                "type": "PERSON"
+            }
+        }
+    }
+
+# Placeholder for the subject ID in the pre-serialized EHR status document
+_SUBJECT_ID_PLACEHOLDER = "__SUBJECT_ID__"
+
+def serialize_ehr_status_template(namespace, scheme):
+    """
+    Serialize the EHR status document once, with a placeholder for the subject ID.
+    
+    The result is passed to render_ehr_status() for each EHR to create, so the
+    document is not walked by the JSON encoder again per EHR.
+    """
+    return orjson.dumps(build_ehr_status(_SUBJECT_ID_PLACEHOLDER, namespace, scheme))
+
+def render_ehr_status(status_template, subject_id):
+    """Substitute a (JSON-escaped) subject ID into a serialized EHR status template."""
+    return status_template.replace(orjson.dumps(_SUBJECT_ID_PLACEHOLDER), orjson.dumps(subject_id), 1)
+
+async def main():
+    """Create one or more new EHRs in the EHRbase server."""
+    parser = argparse.ArgumentParser(description="Create a new EHR in the EHRbase server")
+    parser.add_argument("--ehrbase-url", help="EHRbase URL (defaults to EHRBASE_URL environment variable)")
+    parser.add_argument("--subject-id", help="Subject ID for the EHR (defaults to a random UUID)")
+    parser.add_argument("--namespace", default="EHR", help="Subject namespace (defaults to 'EHR')")
+    parser.add_argument("--scheme", default="http://hl7.org/fhir/Patient", help="ID scheme (defaults to 'http://hl7.org/fhir/Patient')")
+    parser.add_argument("--count", type=int, default=1, help="Number of EHRs to create, each with a random subject ID (defaults to 1)")
+    args = parser.parse_args()
+    
+    if args.count < 1:
+        parser.error("--count must be at least 1")
+    if args.subject_id and args.count > 1:
+        parser.error("--subject-id can only be used when creating a single EHR")
+    
+    # Serialize the parts shared by all EHRs once
+    status_template = serialize_ehr_status_template(args.namespace, args.scheme)
+    
+    # Use a single pooled HTTP session for the lifetime of the script
+    async with EHRbaseClient(base_url=args.ehrbase_url) as ehrbase_client:
+        logger.info(f"Using EHRbase URL: {ehrbase_client.http_client.base_url}")
+        
+        try:
+            for _ in range(args.count):
+                # Use provided subject ID or generate a random one
+                subject_id = args.subject_id or f"test_subject_{uuid.uuid4()}"
+                ehr_status = render_ehr_status(status_template, subject_id)
+                
+                logger.info(f"Creating new EHR for subject ID: {subject_id}, namespace: {args.namespace}")
+                
+                # Create the EHR
+                create_response = await ehrbase_client.create_ehr(ehr_status)
+                
+                # Pretty print the response
+                logger.info(f"Create EHR response: {orjson.dumps(create_response, option=orjson.OPT_INDENT_2).decode()}")
+                
+                # Extract the EHR ID
+                ehr_id = create_response.get("ehr_id", {}).get("value") if isinstance(create_response.get("ehr_id"), dict) else create_response.get("ehr_id")
+                
+                logger.info(f"Successfully created EHR with ID: {ehr_id}")
+                
+                # Machine-readable output
+                print(ehr_id)
+            
+            logger.info("Use the EHR ID when creating compositions or querying the EHR.")
+            
+            return 0
+        except Exception as e:
+            logger.error(f"Error creating EHR: {str(e)}")
+            return 1
+
+def main_sync():
+    """Console script entry point."""
+    log_handler = configure_logging()
+    try:
+        exit_code = run(main())
+    finally:
+        log_handler.close()
+    sys.exit(exit_code)
+
+if __name__ == "__main__":
+    main_sync()
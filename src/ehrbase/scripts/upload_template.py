@@ -0,0 +1,103 @@
+"""
+Initialize EHRbase environment by uploading templates.
+
+This script uploads the vital signs template to the EHRbase server.
+With --template-dir, all *.opt files in a directory are uploaded concurrently.
+"""
+import sys
+import asyncio
+import argparse
+from pathlib import Path
+
+from ehrbase.scripts import run
+from ehrbase.http_client import EHRbaseHttpClient
+from ehrbase.template_client import TemplateClient
+from ehrbase.utils.logging_utils import get_logger
+
+logger = get_logger("initialize_templates")
+
+# Default template, shipped as package data of the ehrbase package
+DEFAULT_TEMPLATE_PATH = Path(__file__).resolve().parents[1] / "resources" / "vital_signs_basic.opt"
+
+# Maximum number of concurrent uploads in directory mode
+MAX_CONCURRENT_UPLOADS = 10
+
+async def upload_templates(template_client, template_paths, max_concurrency=MAX_CONCURRENT_UPLOADS):
+    """
+    Upload several templates concurrently over the shared HTTP session.
+    
+    Args:
+        template_client: The TemplateClient to upload with
+        template_paths: Paths of the OPT files to upload
+        max_concurrency: Maximum number of uploads in flight at once
+        
+    Returns:
+        The number of failed uploads
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    
+    async def upload(template_path):
+        async with semaphore:
+            logger.info(f"Uploading template: {template_path}")
+            return await template_client.upload_template(str(template_path))
+    
+    results = await asyncio.gather(*(upload(path) for path in template_paths), return_exceptions=True)
+    
+    failures = 0
+    for template_path, result in zip(template_paths, results):
+        if isinstance(result, Exception):
+            failures += 1
+            logger.error(f"Failed to upload template {template_path}: {str(result)}")
+        else:
+            logger.info(f"Template upload successful: {template_path}")
+    return failures
+
+async def main():
+    """Upload the vital signs template (or a directory of templates) to EHRbase."""
+    parser = argparse.ArgumentParser(description="Upload vital signs template to EHRbase")
+    parser.add_argument("--ehrbase-url", help="EHRbase URL (defaults to EHRBASE_URL environment variable)")
+    parser.add_argument("--template", help="Path to template file (defaults to vital_signs_basic.opt)")
+    parser.add_argument("--template-dir", help="Directory containing *.opt templates to upload concurrently")
+    args = parser.parse_args()
+    
+    if args.template_dir:
+        template_dir = Path(args.template_dir)
+        if not template_dir.is_dir():
+            logger.error(f"Template directory not found: {template_dir}")
+            return 1
+        
+        template_paths = sorted(template_dir.glob("*.opt"))
+        if not template_paths:
+            logger.error(f"No *.opt templates found in: {template_dir}")
+            return 1
+    else:
+        # Path to the vital signs template
+        if args.template:
+            template_path = Path(args.template)
+        else:
+            # Default to the vital signs template shipped with the package
+            template_path = DEFAULT_TEMPLATE_PATH
+        
+        if not template_path.exists():
+            logger.error(f"Template file not found: {template_path}")
+            return 1
+        
+        template_paths = [template_path]
+    
+    # Use a single pooled HTTP session for the lifetime of the script
+    async with EHRbaseHttpClient(base_url=args.ehrbase_url) as http_client:
+        template_client = TemplateClient(http_client)
+        logger.info(f"Using EHRbase URL: {http_client.base_url}")
+        
+        failures = await upload_templates(template_client, template_paths)
+        if failures:
+            logger.error(f"{failures} of {len(template_paths)} template uploads failed")
+            return 1
+        return 0
+
+def main_sync():
+    """Console script entry point."""
+    sys.exit(run(main()))
+
+if __name__ == "__main__":
+    main_sync()
@@ -6,13 +6,34 @@ This module provides specialized client functionality for template operations:
 - Retrieving template details
 - Generating example compositions from templates
 """
-from utils.logging_utils import get_logger
+import asyncio
+import os
+import orjson
+from cachetools import TTLCache
+from ehrbase.utils.logging_utils import get_logger
 from .http_client import EHRbaseHttpClient
 from .format_config import FormatConfig
 
+# REST path prefix for ADL 1.4 operational templates
+TEMPLATE_PATH = "openehr/v1/definition/template/adl1.4"
+
 class TemplateClient:
     """Client for template-related operations against the EHRbase API."""
     
+    # Templates are immutable once uploaded, so lookups are cached in-process
+    CACHE_SIZE = 256
+    CACHE_TTL = 300
+    
+    # The template listing changes whenever a template is uploaded, so it is only
+    # cached briefly (and dropped on upload through this client)
+    LIST_CACHE_TTL = 30
+    
+    # Size of the chunks streamed from disk when uploading templates
+    UPLOAD_CHUNK_SIZE = 64 * 1024
+    
+    # Maximum number of template requests in flight for bulk lookups
+    BULK_CONCURRENCY = 16
+    
     def __init__(self, http_client=None, format_config=None):
         """
         Initialize the Template Client.
@@ -24,7 +45,46 @@ class TemplateClient:
         """
         self.logger = get_logger("template_client")
         self.http_client = http_client or EHRbaseHttpClient()
-        self.format_config = format_config or FormatConfig()
+        self.format_config = format_config or FormatConfig.default()
+        
+        # FormatConfig is immutable, so resolve the default formats once
+        self._template_list_format = self.format_config.get_template_list_format()
+        self._template_format = self.format_config.get_template_format()
+        self._composition_format = self.format_config.get_composition_format()
+        self._cache = TTLCache(maxsize=self.CACHE_SIZE, ttl=self.CACHE_TTL)
+        self._list_cache = TTLCache(maxsize=8, ttl=self.LIST_CACHE_TTL)
+    
+    async def _cached_request(self, cache_key, path, format_type, cache=None):
+        """
+        Perform a GET request, serving repeat lookups from the template cache.
+        
+        The cache holds the JSON encoding of each response, which is parsed again on
+        every hit, so callers get their own copy and may modify it (e.g. fill in an
+        example composition before creating it).
+        
+        Args:
+            cache_key: Key identifying the cached response
+            path: The API path to request
+            format_type: Format type for the response
+            cache: Cache to use (default: the template cache)
+            
+        Returns:
+            The (possibly cached) response data
+        """
+        cache = self._cache if cache is None else cache
+        cached = cache.get(cache_key)
+        if cached is not None:
+            self.logger.info("Template cache hit for %s", cache_key)
+            return orjson.loads(cached)
+        
+        result = await self.http_client.request(path, format_type=format_type)
+        cache[cache_key] = orjson.dumps(result)
+        return result
+    
+    def clear_cache(self):
+        """Drop all cached template lookups."""
+        self._cache.clear()
+        self._list_cache.clear()
     
     async def list_templates(self, format_type=None):
         """
@@ -34,15 +94,30 @@ class TemplateClient:
             format_type: Format type for the response (optional, uses configuration if not provided)
             
         Returns:
-            A list of templates
+            A list of templates (cached for LIST_CACHE_TTL seconds)
         """
         self.logger.info("Listing all templates")
-        format_type = self.format_config.get_template_list_format(format_type)
-        return await self.http_client.request(
-            "openehr/v1/definition/template/adl1.4",
-            format_type=format_type
+        format_type = format_type or self._template_list_format
+        return await self._cached_request(
+            ("list", format_type),
+            TEMPLATE_PATH,
+            format_type,
+            cache=self._list_cache
         )
     
+    async def list_template_ids(self):
+        """
+        List the IDs of all available templates in EHRbase.
+        
+        Only the template_id field of each entry is parsed from the response, so the
+        rest of the listing is never materialized.
+        
+        Returns:
+            A list of template IDs
+        """
+        self.logger.info("Listing template IDs")
+        return [template_id async for template_id in self.http_client.stream_items(TEMPLATE_PATH, "item.template_id")]
+    
     async def get_template(self, template_id, format_type=None):
         """
         Get a specific template by ID.
@@ -52,13 +127,42 @@ class TemplateClient:
             format_type: Format type for the response (optional, uses configuration if not provided)
             
         Returns:
-            The template data
+            The template data (cached per template ID and format)
         """
         self.logger.info(f"Retrieving template {template_id}")
-        format_type = self.format_config.get_template_format(format_type)
-        return await self.http_client.request(
-            f"openehr/v1/definition/template/adl1.4/{template_id}",
-            format_type=format_type
+        format_type = format_type or self._template_format
+        return await self._cached_request(
+            ("template", template_id, format_type),
+            f"{TEMPLATE_PATH}/{template_id}",
+            format_type
+        )
+    
+    async def get_templates_bulk(self, template_ids, format_type=None, return_exceptions=False):
+        """
+        Get several templates concurrently.
+        
+        The requests share the pooled HTTP/2 connection, so the total wait is close
+        to the slowest fetch instead of the sum.
+        
+        Args:
+            template_ids: List of template IDs to retrieve
+            format_type: Format type for the response (optional, uses configuration if not provided)
+            return_exceptions: If True, failed lookups are returned as exceptions in
+                               the results instead of raising the first failure
+            
+        Returns:
+            The template data, in the same order as template_ids
+        """
+        self.logger.info(f"Retrieving {len(template_ids)} templates")
+        semaphore = asyncio.Semaphore(self.BULK_CONCURRENCY)
+        
+        async def get(template_id):
+            async with semaphore:
+                return await self.get_template(template_id, format_type)
+        
+        return await asyncio.gather(
+            *(get(template_id) for template_id in template_ids),
+            return_exceptions=return_exceptions
         )
     
     async def get_example_composition(self, template_id, format_type=None):
@@ -70,35 +174,52 @@ class TemplateClient:
             format_type: Format type for the response (optional, uses configuration if not provided)
             
         Returns:
-            An example composition
+            An example composition (cached per template ID and format)
         """
         self.logger.info(f"Generating example composition for template {template_id}")
-        format_type = self.format_config.get_composition_format(format_type)
-        return await self.http_client.request(
-            f"openehr/v1/definition/template/adl1.4/{template_id}/example",
-            format_type=format_type
+        format_type = format_type or self._composition_format
+        return await self._cached_request(
+            ("example", template_id, format_type),
+            f"{TEMPLATE_PATH}/{template_id}/example",
+            format_type
         )
     
     async def upload_template(self, template_path):
         """
         Upload an operational template (OPT) to EHRbase.
         
+        The file is streamed from disk in chunks rather than read into memory first.
+        Disk reads run in a worker thread so the event loop keeps serving other requests.
+        The file size is sent as Content-Length, so the body is not chunk-encoded.
+        
         Args:
-            template_path: Path to the OPT file to upload
+            template_path: Path (str or Path) to the OPT file to upload
             
         Returns:
             The response from the template upload operation
         """
-        self.logger.info(f"Reading template from file: {template_path}")
-        with open(template_path, 'r', encoding='utf-8') as file:
-            template_content = file.read()
+        self.logger.info(f"Streaming template from file: {template_path}")
         
-        self.logger.info("Uploading template to EHRbase")
+        # Open eagerly so a missing file fails before any request is made
+        template_file = await asyncio.to_thread(open, template_path, 'rb')
+        with template_file:
+            file_size = (await asyncio.to_thread(os.fstat, template_file.fileno())).st_size
+            self.logger.info(f"Uploading template to EHRbase ({file_size} bytes)")
+            
+            # Use the HTTP client to make the request with the raw XML content
+            response = await self.http_client.request(
+                TEMPLATE_PATH,
+                method="POST",
+                content=self._iter_file(template_file),
+                format_type="xml",
+                headers={"Content-Length": str(file_size)}
+            )
         
-        # Use the HTTP client to make the request with raw XML content
-        return await self.http_client.request(
-            "openehr/v1/definition/template/adl1.4",
-            method="POST",
-            content=template_content,
-            format_type="xml"
-        )
+        # A new template may shadow cached lookups
+        self.clear_cache()
+        return response
+    
+    async def _iter_file(self, template_file):
+        """Yield the contents of an open binary file in UPLOAD_CHUNK_SIZE chunks."""
+        while chunk := await asyncio.to_thread(template_file.read, self.UPLOAD_CHUNK_SIZE):
+            yield chunk
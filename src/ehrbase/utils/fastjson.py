@@ -0,0 +1,63 @@
+"""
+JSON serialization helpers for MCP tool responses, backed by orjson.
+
+Tool results are parsed by MCP clients rather than read, so they are written
+without indentation unless OPENEHR_MCP_PRETTY=1 is set for debugging. FastMCP
+only passes str results through as text content, so the bytes from orjson are
+decoded once here.
+"""
+import os
+import orjson
+
+# Indent tool responses for human inspection (off by default)
+PRETTY = os.getenv("OPENEHR_MCP_PRETTY", "0") == "1"
+DUMPS_OPTIONS = orjson.OPT_INDENT_2 if PRETTY else None
+
+def dumps(obj):
+    """
+    Serialize an object to a JSON string (indented only if PRETTY is set).
+    
+    Values orjson cannot serialize natively (e.g. Decimal) are converted with str().
+    
+    Args:
+        obj: The object to serialize
+        
+    Returns:
+        JSON string
+    """
+    return orjson.dumps(obj, default=str, option=DUMPS_OPTIONS).decode()
+
+async def dumps_rows(columns, rows):
+    """
+    Serialize streamed query result rows to a {"columns", "rows", "total"} JSON string.
+    
+    Each row is encoded as it arrives and appended to one buffer, so the full result
+    set is never held as Python objects next to its JSON encoding.
+    
+    Args:
+        columns: List of column names
+        rows: Async iterable of result rows (lists of column values)
+        
+    Returns:
+        JSON string
+    """
+    if PRETTY:
+        rows = [row async for row in rows]
+        return dumps({"columns": columns, "rows": rows, "total": len(rows)})
+    
+    buffer = bytearray(b'{"columns":')
+    buffer += orjson.dumps(columns)
+    buffer += b',"rows":['
+    total = 0
+    async for row in rows:
+        if total:
+            buffer += b","
+        buffer += orjson.dumps(row, default=str)
+        total += 1
+    buffer += b'],"total":%d}' % total
+    return buffer.decode()
+
+loads = orjson.loads
+
+# Raised by loads(); a subclass of json.JSONDecodeError
+JSONDecodeError = orjson.JSONDecodeError
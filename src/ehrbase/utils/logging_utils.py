@@ -4,21 +4,26 @@ Logging utilities for the openEHR MCP server and related components.
 import logging
 import time
 import os
+from functools import lru_cache
 from pathlib import Path
 
 # Configure standard logging format
 LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 
+# Numeric level, resolved once (unknown names fall back to INFO)
+_LEVEL = getattr(logging, LOG_LEVEL, logging.INFO)
+
 # Initialize root logger - only log to stdout
 logging.basicConfig(
-    level=getattr(logging, LOG_LEVEL),
+    level=_LEVEL,
     format=LOG_FORMAT,
     handlers=[
         logging.StreamHandler()
     ]
 )
 
+@lru_cache(maxsize=None)
 def get_logger(name):
     """
     Get a logger with the specified name and consistent formatting.
@@ -27,10 +32,10 @@ def get_logger(name):
         name: The name of the logger, typically __name__ or component name
         
     Returns:
-        A configured logger instance
+        A configured logger instance (the same instance for repeat calls with a name)
     """
     logger = logging.getLogger(name)
-    logger.setLevel(getattr(logging, LOG_LEVEL))
+    logger.setLevel(_LEVEL)
     return logger
 
 def log_incoming_message(logger, message_type, content=None, **kwargs):
@@ -3,7 +3,6 @@ Prompts for the openEHR MCP Server.
 
 This module defines reusable prompts that help LLMs interact with the openEHR MCP server effectively.
 """
-from mcp.server.fastmcp.prompts import base
 
 def register_prompts(mcp):
     """
@@ -1,12 +1,20 @@
 from fastmcp import FastMCP
-import json
-import time
+import asyncio
+import functools
+import inspect
+import logging
 import os
-import argparse
+import string
+import time
 import sys
+from contextlib import asynccontextmanager
+from types import MappingProxyType, SimpleNamespace
 
 # Import custom logging utilities
-from utils.logging_utils import get_logger
+from ehrbase.utils.logging_utils import get_logger
+
+# Import JSON serialization for tool responses
+from ehrbase.utils import fastjson
 
 # Import the EHRbase client facade
 from ehrbase import EHRbaseClient
@@ -17,18 +25,27 @@ from mcp_prompts import register_prompts
 # Get a logger for this module
 logger = get_logger("openehr_mcp_server")
 
-# Initialize the EHRbase client
+# Initialize the EHRbase client once; all tools share its pooled keep-alive
+# connections, which are closed by the server lifespan below
 ehrbase_client = EHRbaseClient()
 
 # Get default EHR ID from client
 DEFAULT_EHR_ID = ehrbase_client.default_ehr_id
 
-# Initialize the MCP server with the official SDK
-mcp = FastMCP("openEHR MCP Server")
+# AQL queries used by the listing tools
+EHR_IDS_QUERY = "SELECT e/ehr_id/value AS ehr_id FROM EHR e"
+COMPOSITIONS_BY_TEMPLATE_QUERY = "SELECT e/ehr_id/value AS ehr_id, c AS composition FROM EHR e CONTAINS COMPOSITION c WHERE c/archetype_details/template_id/value = $template_id"
+COMPOSITIONS_BY_TEMPLATE_COLUMNS = ["ehr_id", "composition"]
+COMPOSITION_UIDS_BY_TEMPLATE_QUERY = "SELECT e/ehr_id/value AS ehr_id, c/uid/value AS composition_uid FROM EHR e CONTAINS COMPOSITION c WHERE c/archetype_details/template_id/value = $template_id"
+
+# Maximum number of per-item calls in flight for a single fan-out tool call
+BULK_CONCURRENCY = int(os.getenv("OPENEHR_MCP_BULK_CONCURRENCY", "10"))
 
-# Register prompts and resources
-mcp = register_prompts(mcp)
-logger.info("Registered prompts and resources for the openEHR MCP Server")
+@asynccontextmanager
+async def lifespan(server):
+    """Keep the EHRbase connection pool open for the server's lifetime and close it on shutdown."""
+    async with ehrbase_client:
+        yield
 
 # TRANSPORT PLUGIN SYSTEM
 class TransportPlugin:
@@ -52,13 +69,20 @@ class StdioTransportPlugin(TransportPlugin):
         logger.info("Using stdio transport")
         mcp_server.run(transport='stdio')
 
-# Global transport registry
+# Global transport registry, made read-only by freeze_transport_plugins() at startup
 _transport_plugins = {}
 
 def register_transport_plugin(plugin: TransportPlugin):
     """Register a transport plugin."""
+    if isinstance(_transport_plugins, MappingProxyType):
+        raise RuntimeError(f"Cannot register transport plugin {plugin.name}: the registry is frozen")
     _transport_plugins[plugin.name] = plugin
-    logger.info(f"Registered transport plugin: {plugin.name}")
+    logger.info("Registered transport plugin: %s", plugin.name)
+
+def freeze_transport_plugins():
+    """Make the transport registry read-only once all plugins have been registered."""
+    global _transport_plugins
+    _transport_plugins = MappingProxyType(dict(_transport_plugins))
 
 def get_transport_plugin(name: str) -> TransportPlugin:
     """Get a registered transport plugin by name."""
@@ -66,13 +90,91 @@ def get_transport_plugin(name: str) -> TransportPlugin:
 
 def list_transport_plugins():
     """List all registered transport plugins."""
-    return list(_transport_plugins.keys())
+    return list(_transport_plugins)
 
 # Register the default stdio transport
 register_transport_plugin(StdioTransportPlugin())
 
+class ToolInputError(ValueError):
+    """Raised by tools for invalid arguments; the message is returned to the client without logging."""
+
+def _coerce_json(value):
+    """Parse a JSON string tool argument; values already decoded by the MCP client are returned as-is."""
+    return fastjson.loads(value) if type(value) is str else value
+
+async def _gather_bounded(coros, limit=BULK_CONCURRENCY, return_exceptions=False):
+    """
+    Await coroutines concurrently with at most limit of them running at once.
+    
+    Used by tools that fan out one call per item (EHRbase lookups, and any future
+    per-item ctx.sample calls), so large result sets cannot flood the server.
+    
+    Args:
+        coros: Iterable of coroutines to run
+        limit: Maximum number of coroutines running at once
+        return_exceptions: If True, failures are returned as exceptions in the results
+                           instead of raising the first one
+        
+    Returns:
+        The results, in the same order as coros
+    """
+    semaphore = asyncio.Semaphore(limit)
+    
+    async def bounded(coro):
+        async with semaphore:
+            return await coro
+    
+    return await asyncio.gather(*(bounded(coro) for coro in coros), return_exceptions=return_exceptions)
+
+def mcp_tool_wrap(error_message):
+    """
+    Wrap an MCP tool coroutine with the timing, serialization and error handling shared by all tools.
+    
+    The tool returns its result data, which is serialized to JSON. str results (already
+    serialized responses) are returned unchanged. A ToolInputError is returned as its
+    message before any logging, so invalid calls stay cheap; other exceptions are logged
+    and returned as an error message string.
+    
+    Args:
+        error_message: Prefix of the message returned on failure; may reference the tool's
+                       arguments by name, e.g. "Error retrieving template {template_id}"
+        
+    Returns:
+        A decorator for tool coroutines
+    """
+    def decorator(fn):
+        signature = inspect.signature(fn)
+        
+        # Constant messages are used as-is; only templates need the arguments bound on failure
+        needs_arguments = any(field is not None for _, field, _, _ in string.Formatter().parse(error_message))
+        
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            start_time = time.perf_counter()
+            try:
+                result = await fn(*args, **kwargs)
+                response = result if isinstance(result, str) else fastjson.dumps(result)
+            except ToolInputError as e:
+                return str(e)
+            except Exception as e:
+                elapsed = time.perf_counter() - start_time
+                prefix = error_message
+                if needs_arguments:
+                    arguments = signature.bind(*args, **kwargs)
+                    arguments.apply_defaults()
+                    prefix = error_message.format(**arguments.arguments)
+                logger.error("%s: %s after %.2fs", prefix, e, elapsed)
+                return prefix + ": " + str(e)
+            
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("%s completed in %.2fs", fn.__name__, time.perf_counter() - start_time)
+            return response
+        
+        return wrapper
+    return decorator
+
 # TOOLS - Actions to perform with templates and EHRs
-@mcp.tool()
+@mcp_tool_wrap("Error listing templates")
 async def openehr_template_list() -> str:
     """List all available openEHR templates from the EHRbase server.
     
@@ -83,24 +185,11 @@ async def openehr_template_list() -> str:
         JSON string containing the list of available openEHR templates
     """
     logger.info("MCP Tool call: openehr_template_list")
-    start_time = time.time()
     
-    try:
-        # Get templates using the fixed formats in the client
-        templates = await ehrbase_client.get_template_list()
-        result = json.dumps(templates, indent=2)
-        
-        elapsed = time.time() - start_time
-        count = len(templates) if isinstance(templates, list) else 'N/A'
-        logger.info(f"Returning template list with {count} templates in {elapsed:.2f}s")
-        return result
-    except Exception as e:
-        elapsed = time.time() - start_time
-        error_msg = f"Error listing templates: {str(e)}"
-        logger.error(f"{error_msg} after {elapsed:.2f}s")
-        return error_msg
+    # Get templates using the fixed formats in the client
+    return await ehrbase_client.get_template_list()
 
-@mcp.tool()
+@mcp_tool_wrap("Error retrieving template {template_id}")
 async def openehr_template_get(template_id: str) -> str:
     """Retrieve a specific openEHR template by its unique identifier.
     
@@ -115,24 +204,12 @@ async def openehr_template_get(template_id: str) -> str:
     Returns:
         JSON string containing the complete openEHR template definition
     """
-    logger.info(f"MCP Tool call: openehr_template_get with ID {template_id}")
-    start_time = time.time()
+    logger.info("MCP Tool call: openehr_template_get with ID %s", template_id)
     
-    try:
-        # Get template using the fixed formats in the client
-        template = await ehrbase_client.get_template(template_id)
-        result = json.dumps(template, indent=2)
-        
-        elapsed = time.time() - start_time
-        logger.info(f"Retrieved template {template_id} in {elapsed:.2f}s")
-        return result
-    except Exception as e:
-        elapsed = time.time() - start_time
-        error_msg = f"Error retrieving template {template_id}: {str(e)}"
-        logger.error(f"{error_msg} after {elapsed:.2f}s")
-        return error_msg
+    # Get template using the fixed formats in the client (cached there)
+    return await ehrbase_client.get_template(template_id)
 
-@mcp.tool()
+@mcp_tool_wrap("Error generating example")
 async def openehr_template_example_composition(template_id: str) -> str:
     """Generate an example openEHR composition based on a specific template.
     
@@ -147,26 +224,14 @@ async def openehr_template_example_composition(template_id: str) -> str:
     Returns:
         JSON string containing an example openEHR composition in flat JSON format
     """
-    logger.info(f"MCP Tool call: openehr_template_example_composition for template {template_id}")
-    start_time = time.time()
+    logger.info("MCP Tool call: openehr_template_example_composition for template %s", template_id)
     
-    try:
-        # Get example composition using the fixed formats in the client
-        example = await ehrbase_client.get_template_example(template_id)
-        result = json.dumps(example, indent=2)
-        
-        elapsed = time.time() - start_time
-        logger.info(f"Generated example composition for {template_id} in {elapsed:.2f}s")
-        return result
-    except Exception as e:
-        elapsed = time.time() - start_time
-        error_msg = f"Error generating example: {str(e)}"
-        logger.error(f"{error_msg} after {elapsed:.2f}s")
-        return error_msg
+    # Get example composition using the fixed formats in the client (cached there)
+    return await ehrbase_client.get_template_example(template_id)
 
 
 # EHR MANAGEMENT TOOLS
-@mcp.tool()
+@mcp_tool_wrap("Error creating EHR")
 async def openehr_ehr_create(ehr_status=None) -> str:
     """Create a new EHR in the system.
     
@@ -180,36 +245,18 @@ async def openehr_ehr_create(ehr_status=None) -> str:
     Returns:
         JSON string containing the new EHR ID and creation response
     """
-    logger.info(f"MCP Tool call: openehr_ehr_create")
-    start_time = time.time()
-    
+    # Handle ehr_status as either string or dict
     try:
-        # Handle ehr_status as either string or dict
-        status_json = None
-        if ehr_status:
-            if isinstance(ehr_status, str):
-                try:
-                    status_json = json.loads(ehr_status)
-                except json.JSONDecodeError:
-                    return f"Error: ehr_status must be a valid JSON string, received: {ehr_status}"
-            else:
-                # If it's already a dict/object, use it directly
-                status_json = ehr_status
-        
-        # Create the EHR
-        result = await ehrbase_client.create_ehr(status_json)
-        response = json.dumps(result, indent=2)
-        
-        elapsed = time.time() - start_time
-        logger.info(f"Created EHR in {elapsed:.2f}s with ID: {result.get('ehr_id', 'unknown')}")
-        return response
-    except Exception as e:
-        elapsed = time.time() - start_time
-        error_msg = f"Error creating EHR: {str(e)}"
-        logger.error(f"{error_msg} after {elapsed:.2f}s")
-        return error_msg
+        status_json = _coerce_json(ehr_status) if ehr_status else None
+    except fastjson.JSONDecodeError:
+        raise ToolInputError(f"Error: ehr_status must be a valid JSON string, received: {ehr_status}") from None
+    
+    logger.info("MCP Tool call: openehr_ehr_create")
+    
+    # Create the EHR
+    return await ehrbase_client.create_ehr(status_json)
 
-@mcp.tool()
+@mcp_tool_wrap("Error retrieving EHR")
 async def openehr_ehr_get(ehr_id: str) -> str:
     """Retrieve an EHR by its ID.
     
@@ -224,26 +271,14 @@ async def openehr_ehr_get(ehr_id: str) -> str:
         JSON string containing the EHR details
     """
     if not ehr_id:
-        return "Error: No EHR ID provided"
-        
-    logger.info(f"MCP Tool call: openehr_ehr_get for EHR {ehr_id}")
-    start_time = time.time()
+        raise ToolInputError("Error: No EHR ID provided")
     
-    try:
-        # Retrieve the EHR
-        result = await ehrbase_client.get_ehr(ehr_id)
-        response = json.dumps(result, indent=2)
-        
-        elapsed = time.time() - start_time
-        logger.info(f"Retrieved EHR in {elapsed:.2f}s")
-        return response
-    except Exception as e:
-        elapsed = time.time() - start_time
-        error_msg = f"Error retrieving EHR: {str(e)}"
-        logger.error(f"{error_msg} after {elapsed:.2f}s")
-        return error_msg
+    logger.info("MCP Tool call: openehr_ehr_get for EHR %s", ehr_id)
+    
+    # Retrieve the EHR
+    return await ehrbase_client.get_ehr(ehr_id)
 
-@mcp.tool()
+@mcp_tool_wrap("Error listing EHRs")
 async def openehr_ehr_list() -> str:
     """List all available EHRs in the system.
     
@@ -255,37 +290,20 @@ async def openehr_ehr_list() -> str:
         JSON string containing the list of EHR IDs
     """
     logger.info("MCP Tool call: openehr_ehr_list")
-    start_time = time.time()
     
-    try:
-        # Use the ad hoc query functionality to get all EHR IDs
-        query = "SELECT e/ehr_id/value AS ehr_id FROM EHR e"
-        query_result = await ehrbase_client.execute_adhoc_query(query)
-        
-        # Extract just the EHR IDs from the query result for a cleaner response
-        ehr_ids = []
-        if "rows" in query_result:
-            for row in query_result["rows"]:
-                if row and len(row) > 0:
-                    ehr_ids.append(row[0])
-        
-        # Format the response
-        result = {
-            "ehr_ids": ehr_ids,
-            "total": len(ehr_ids)
-        }
-        response = json.dumps(result, indent=2)
-        
-        elapsed = time.time() - start_time
-        logger.info(f"Listed {len(ehr_ids)} EHRs in {elapsed:.2f}s")
-        return response
-    except Exception as e:
-        elapsed = time.time() - start_time
-        error_msg = f"Error listing EHRs: {str(e)}"
-        logger.error(f"{error_msg} after {elapsed:.2f}s")
-        return error_msg
+    # Use the ad hoc query functionality to get all EHR IDs
+    query_result = await ehrbase_client.execute_adhoc_query(EHR_IDS_QUERY)
+    
+    # Extract just the EHR IDs from the query result for a cleaner response
+    ehr_ids = [row[0] for row in query_result.get("rows", ()) if row]
+    
+    # Format the response
+    return {
+        "ehr_ids": ehr_ids,
+        "total": len(ehr_ids)
+    }
 
-@mcp.tool()
+@mcp_tool_wrap("Error retrieving EHR by subject")
 async def openehr_ehr_get_by_subject(subject_id: str, subject_namespace: str) -> str:
     """Get an EHR by subject ID and namespace.
     
@@ -301,27 +319,15 @@ async def openehr_ehr_get_by_subject(subject_id: str, subject_namespace: str) ->
         JSON string containing the EHR details
     """
     if not subject_id or not subject_namespace:
-        return "Error: Both subject_id and subject_namespace are required"
-        
-    logger.info(f"MCP Tool call: openehr_ehr_get_by_subject for subject {subject_id} in namespace {subject_namespace}")
-    start_time = time.time()
+        raise ToolInputError("Error: Both subject_id and subject_namespace are required")
     
-    try:
-        # Get EHR by subject ID and namespace
-        ehr = await ehrbase_client.get_ehr_by_subject_id(subject_id, subject_namespace)
-        result = json.dumps(ehr, indent=2)
-        
-        elapsed = time.time() - start_time
-        logger.info(f"Retrieved EHR for subject {subject_id} in {elapsed:.2f}s")
-        return result
-    except Exception as e:
-        elapsed = time.time() - start_time
-        error_msg = f"Error retrieving EHR by subject: {str(e)}"
-        logger.error(f"{error_msg} after {elapsed:.2f}s")
-        return error_msg
+    logger.info("MCP Tool call: openehr_ehr_get_by_subject for subject %s in namespace %s", subject_id, subject_namespace)
+    
+    # Get EHR by subject ID and namespace
+    return await ehrbase_client.get_ehr_by_subject_id(subject_id, subject_namespace)
 
 # COMPOSITION LIFECYCLE TOOLS
-@mcp.tool()
+@mcp_tool_wrap("Error creating composition")
 async def openehr_composition_create(composition_data = None, ehr_id = None) -> str:
     """Create a new openEHR composition in the Electronic Health Record.
     
@@ -339,39 +345,23 @@ async def openehr_composition_create(composition_data = None, ehr_id = None) ->
     """
     
     if not composition_data:
-        return "Error: No composition data provided"
+        raise ToolInputError("Error: No composition data provided")
     
     # Use provided EHR ID or fall back to default
     target_ehr_id = ehr_id or DEFAULT_EHR_ID
-        
-    logger.info(f"MCP Tool call: openehr_composition_create for EHR {target_ehr_id}")
-    start_time = time.time()
     
+    # Handle composition_data as either string or dict
     try:
-        # Handle composition_data as either string or dict
-        if isinstance(composition_data, str):
-            try:
-                composition_json = json.loads(composition_data)
-            except json.JSONDecodeError:
-                return f"Error: composition_data must be a valid JSON string, received: {composition_data}"
-        else:
-            # If it's already a dict/object, use it directly
-            composition_json = composition_data
-        
-        # Create the composition using the specified EHR ID
-        result = await ehrbase_client.create_composition(target_ehr_id, composition_json)
-        response = json.dumps(result, indent=2)
-        
-        elapsed = time.time() - start_time
-        logger.info(f"Created composition in {elapsed:.2f}s")
-        return response
-    except Exception as e:
-        elapsed = time.time() - start_time
-        error_msg = f"Error creating composition: {str(e)}"
-        logger.error(f"{error_msg} after {elapsed:.2f}s")
-        return error_msg
+        composition_json = _coerce_json(composition_data)
+    except fastjson.JSONDecodeError:
+        raise ToolInputError(f"Error: composition_data must be a valid JSON string, received: {composition_data}") from None
+    
+    logger.info("MCP Tool call: openehr_composition_create for EHR %s", target_ehr_id)
+    
+    # Create the composition using the specified EHR ID
+    return await ehrbase_client.create_composition(target_ehr_id, composition_json)
 
-@mcp.tool()
+@mcp_tool_wrap("Error retrieving composition")
 async def openehr_composition_get(composition_uid: str, ehr_id = None) -> str:
     """Retrieve an existing openEHR composition by its unique identifier.
     
@@ -388,29 +378,17 @@ async def openehr_composition_get(composition_uid: str, ehr_id = None) -> str:
     """
     
     if not composition_uid:
-        return "Error: No composition UID provided"
+        raise ToolInputError("Error: No composition UID provided")
     
     # Use provided EHR ID or fall back to default
     target_ehr_id = ehr_id or DEFAULT_EHR_ID
-        
-    logger.info(f"MCP Tool call: openehr_composition_get for composition {composition_uid} in EHR {target_ehr_id}")
-    start_time = time.time()
     
-    try:
-        # Retrieve the composition using the specified EHR ID
-        result = await ehrbase_client.get_composition(target_ehr_id, composition_uid)
-        response = json.dumps(result, indent=2)
-        
-        elapsed = time.time() - start_time
-        logger.info(f"Retrieved composition in {elapsed:.2f}s")
-        return response
-    except Exception as e:
-        elapsed = time.time() - start_time
-        error_msg = f"Error retrieving composition: {str(e)}"
-        logger.error(f"{error_msg} after {elapsed:.2f}s")
-        return error_msg
+    logger.info("MCP Tool call: openehr_composition_get for composition %s in EHR %s", composition_uid, target_ehr_id)
+    
+    # Retrieve the composition using the specified EHR ID
+    return await ehrbase_client.get_composition(target_ehr_id, composition_uid)
 
-@mcp.tool()
+@mcp_tool_wrap("Error updating composition")
 async def openehr_composition_update(composition_uid: str, composition_data, ehr_id = None) -> str:
     """Update an existing openEHR composition in the Electronic Health Record.
     
@@ -430,42 +408,26 @@ async def openehr_composition_update(composition_uid: str, composition_data, ehr
     """
     
     if not composition_uid:
-        return "Error: No composition UID provided"
-        
+        raise ToolInputError("Error: No composition UID provided")
+    
     if not composition_data:
-        return "Error: No composition data provided"
+        raise ToolInputError("Error: No composition data provided")
     
     # Use provided EHR ID or fall back to default
     target_ehr_id = ehr_id or DEFAULT_EHR_ID
-        
-    logger.info(f"MCP Tool call: openehr_composition_update for composition {composition_uid} in EHR {target_ehr_id}")
-    start_time = time.time()
     
+    # Handle composition_data as either string or dict
     try:
-        # Handle composition_data as either string or dict
-        if isinstance(composition_data, str):
-            try:
-                composition_json = json.loads(composition_data)
-            except json.JSONDecodeError:
-                return f"Error: composition_data must be a valid JSON string, received: {composition_data}"
-        else:
-            # If it's already a dict/object, use it directly
-            composition_json = composition_data
-        
-        # Update the composition using the specified EHR ID
-        result = await ehrbase_client.update_composition(target_ehr_id, composition_uid, composition_json)
-        response = json.dumps(result, indent=2)
-        
-        elapsed = time.time() - start_time
-        logger.info(f"Updated composition in {elapsed:.2f}s")
-        return response
-    except Exception as e:
-        elapsed = time.time() - start_time
-        error_msg = f"Error updating composition: {str(e)}"
-        logger.error(f"{error_msg} after {elapsed:.2f}s")
-        return error_msg
+        composition_json = _coerce_json(composition_data)
+    except fastjson.JSONDecodeError:
+        raise ToolInputError(f"Error: composition_data must be a valid JSON string, received: {composition_data}") from None
+    
+    logger.info("MCP Tool call: openehr_composition_update for composition %s in EHR %s", composition_uid, target_ehr_id)
+    
+    # Update the composition using the specified EHR ID
+    return await ehrbase_client.update_composition(target_ehr_id, composition_uid, composition_json)
 
-@mcp.tool()
+@mcp_tool_wrap("Error deleting composition")
 async def openehr_composition_delete(preceding_version_uid: str, ehr_id = None) -> str:
     """Delete an existing openEHR composition from the Electronic Health Record.
     
@@ -484,29 +446,17 @@ async def openehr_composition_delete(preceding_version_uid: str, ehr_id = None)
     """
     
     if not preceding_version_uid:
-        return "Error: No composition version UID provided"
+        raise ToolInputError("Error: No composition version UID provided")
     
     # Use provided EHR ID or fall back to default
     target_ehr_id = ehr_id or DEFAULT_EHR_ID
-        
-    logger.info(f"MCP Tool call: openehr_composition_delete for version {preceding_version_uid} in EHR {target_ehr_id}")
-    start_time = time.time()
     
-    try:
-        # Delete the composition using the specified EHR ID
-        result = await ehrbase_client.delete_composition(target_ehr_id, preceding_version_uid)
-        response = json.dumps(result, indent=2)
-        
-        elapsed = time.time() - start_time
-        logger.info(f"Deleted composition in {elapsed:.2f}s")
-        return response
-    except Exception as e:
-        elapsed = time.time() - start_time
-        error_msg = f"Error deleting composition: {str(e)}"
-        logger.error(f"{error_msg} after {elapsed:.2f}s")
-        return error_msg
+    logger.info("MCP Tool call: openehr_composition_delete for version %s in EHR %s", preceding_version_uid, target_ehr_id)
+    
+    # Delete the composition using the specified EHR ID
+    return await ehrbase_client.delete_composition(target_ehr_id, preceding_version_uid)
 
-@mcp.tool()
+@mcp_tool_wrap("Error executing query")
 async def openehr_query_adhoc(query: str, query_parameters = None) -> str:
     """Execute an ad-hoc AQL query against the openEHR server.
     
@@ -524,38 +474,20 @@ async def openehr_query_adhoc(query: str, query_parameters = None) -> str:
     """
     
     if not query:
-        return "Error: No query provided"
-    
-    logger.info(f"MCP Tool call: openehr_query_adhoc")
-    start_time = time.time()
+        raise ToolInputError("Error: No query provided")
     
+    # Handle query_parameters as either string or dict
     try:
-        # Handle query_parameters as either string or dict
-        params = None
-        if query_parameters:
-            if isinstance(query_parameters, str):
-                try:
-                    params = json.loads(query_parameters)
-                except json.JSONDecodeError:
-                    return f"Error: query_parameters must be a valid JSON string, received: {query_parameters}"
-            else:
-                # If it's already a dict/object, use it directly
-                params = query_parameters
-        
-        # Execute the query
-        result = await ehrbase_client.execute_adhoc_query(query, params)
-        response = json.dumps(result, indent=2)
-        
-        elapsed = time.time() - start_time
-        logger.info(f"Executed ad-hoc query in {elapsed:.2f}s")
-        return response
-    except Exception as e:
-        elapsed = time.time() - start_time
-        error_msg = f"Error executing query: {str(e)}"
-        logger.error(f"{error_msg} after {elapsed:.2f}s")
-        return error_msg
+        params = _coerce_json(query_parameters) if query_parameters else None
+    except fastjson.JSONDecodeError:
+        raise ToolInputError(f"Error: query_parameters must be a valid JSON string, received: {query_parameters}") from None
+    
+    logger.info("MCP Tool call: openehr_query_adhoc")
+    
+    # Execute the query
+    return await ehrbase_client.execute_adhoc_query(query, params)
 
-@mcp.tool()
+@mcp_tool_wrap("Error listing compositions for template {template_id}")
 async def openehr_compositions_list(template_id: str) -> str:
     """List all compositions for a specific openEHR template.
     
@@ -567,46 +499,128 @@ async def openehr_compositions_list(template_id: str) -> str:
         template_id: The unique identifier of the openEHR template to filter compositions by
         
     Returns:
-        JSON string containing the list of compositions that use the specified template
+        JSON string with the column names, the result rows ([ehr_id, composition] for each
+        composition that uses the specified template) and the total row count
     """
-    logger.info(f"MCP Tool call: openehr_compositions_list for template {template_id}")
-    start_time = time.time()
+    logger.info("MCP Tool call: openehr_compositions_list for template %s", template_id)
     
-    try:
-        # Prepare the AQL query to find all compositions for the template
-        query = "SELECT e/ehr_id/value AS ehr_id, c AS composition FROM EHR e CONTAINS COMPOSITION c WHERE c/archetype_details/template_id/value = $template_id"
-        query_parameters = {"template_id": template_id}
-        
-        # Execute the query using the query client
-        result = await ehrbase_client.execute_adhoc_query(query, query_parameters)
-        response = json.dumps(result, indent=2)
-        
-        # Get the count of compositions found
-        composition_count = len(result.get("rows", [])) if isinstance(result, dict) and "rows" in result else 0
-        
-        elapsed = time.time() - start_time
-        logger.info(f"Listed {composition_count} compositions for template {template_id} in {elapsed:.2f}s")
-        return response
-    except Exception as e:
-        elapsed = time.time() - start_time
-        error_msg = f"Error listing compositions for template {template_id}: {str(e)}"
-        logger.error(f"{error_msg} after {elapsed:.2f}s")
-        return error_msg
+    # Stream the result rows straight into the response; compositions can be large,
+    # so the whole result set is never materialized at once
+    rows = ehrbase_client.execute_adhoc_query_stream(COMPOSITIONS_BY_TEMPLATE_QUERY, {"template_id": template_id})
+    return await fastjson.dumps_rows(COMPOSITIONS_BY_TEMPLATE_COLUMNS, rows)
 
+@mcp_tool_wrap("Error retrieving compositions for template {template_id}")
+async def openehr_compositions_bulk_get(template_id: str) -> str:
+    """Retrieve all compositions for a specific openEHR template in flat JSON format.
+    
+    Finds the compositions created with the specified template using a single AQL query,
+    then fetches each of them concurrently from the EHRbase server. Unlike
+    openehr_compositions_list, the compositions are returned in the same flat JSON format
+    as openehr_composition_get.
+    
+    Args:
+        template_id: The unique identifier of the openEHR template to filter compositions by
+        
+    Returns:
+        JSON string containing the EHR ID, composition UID and composition data for each match.
+        Compositions that could not be fetched (e.g. deleted after the query) are listed
+        with an "error" message in place of their data, and counted in "failed".
+    """
+    logger.info("MCP Tool call: openehr_compositions_bulk_get for template %s", template_id)
+    
+    # Look up only the identifiers; the compositions themselves are fetched below
+    query_result = await ehrbase_client.execute_adhoc_query(COMPOSITION_UIDS_BY_TEMPLATE_QUERY, {"template_id": template_id})
+    rows = query_result.get("rows", [])
+    
+    # Fetch the compositions concurrently, with a bounded number of requests in flight.
+    # One failed fetch is reported next to its UID instead of failing the whole call.
+    compositions = await _gather_bounded(
+        (ehrbase_client.get_composition(ehr_id, composition_uid) for ehr_id, composition_uid in rows),
+        return_exceptions=True
+    )
+    
+    items = []
+    failed = 0
+    for (ehr_id, composition_uid), composition in zip(rows, compositions):
+        if isinstance(composition, BaseException):
+            failed += 1
+            items.append({"ehr_id": ehr_id, "composition_uid": composition_uid, "error": str(composition)})
+        else:
+            items.append({"ehr_id": ehr_id, "composition_uid": composition_uid, "composition": composition})
+    
+    result = {
+        "compositions": items,
+        "total": len(items),
+        "failed": failed
+    }
+    return result
+
+
+# Tools exposed by the server, in registration order
+TOOLS = (
+    openehr_template_list,
+    openehr_template_get,
+    openehr_template_example_composition,
+    openehr_ehr_create,
+    openehr_ehr_get,
+    openehr_ehr_list,
+    openehr_ehr_get_by_subject,
+    openehr_composition_create,
+    openehr_composition_get,
+    openehr_composition_update,
+    openehr_composition_delete,
+    openehr_query_adhoc,
+    openehr_compositions_list,
+    openehr_compositions_bulk_get,
+)
+
+def build_mcp():
+    """
+    Create the MCP server and register its tools, prompts and resources.
+    
+    Registration happens here rather than at import time, so importing this module
+    (e.g. from tests) does not pay for building the server.
+    
+    Returns:
+        The configured FastMCP server
+    """
+    # Initialize the MCP server with the official SDK
+    mcp = FastMCP("openEHR MCP Server", lifespan=lifespan)
+    
+    for tool in TOOLS:
+        mcp.tool()(tool)
+    
+    # Register prompts and resources
+    mcp = register_prompts(mcp)
+    logger.info("Registered tools, prompts and resources for the openEHR MCP Server")
+    return mcp
 
+def __getattr__(name):
+    # Build the server on first access to openehr_mcp_server.mcp (e.g. by `fastmcp run`)
+    if name == "mcp":
+        value = globals()["mcp"] = build_mcp()
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Run the server
 if __name__ == "__main__":
-    import argparse
+    # All plugins are registered at import time; no more may be added once the server starts
+    freeze_transport_plugins()
     
-    # Parse command line arguments
-    parser = argparse.ArgumentParser(description='openEHR MCP Server')
-    parser.add_argument('--transport', type=str, default='stdio',
-                        help=f'Transport type (available: {", ".join(list_transport_plugins())})')
-    parser.add_argument('--list-transports', action='store_true',
-                        help='List available transport plugins')
-    
-    args, unknown = parser.parse_known_args()
+    if len(sys.argv) == 1:
+        # Default invocation (as spawned by MCP hosts): skip importing and running argparse
+        args = SimpleNamespace(transport='stdio', list_transports=False)
+    else:
+        import argparse
+        
+        # Parse command line arguments
+        parser = argparse.ArgumentParser(description='openEHR MCP Server')
+        parser.add_argument('--transport', type=str, default='stdio',
+                            help=f'Transport type (available: {", ".join(list_transport_plugins())})')
+        parser.add_argument('--list-transports', action='store_true',
+                            help='List available transport plugins')
+        
+        args, unknown = parser.parse_known_args()
     
     # List available transports if requested
     if args.list_transports:
@@ -616,18 +630,18 @@ if __name__ == "__main__":
         sys.exit(0)
     
     # Log the server configuration
-    logger.info(f"Starting openEHR MCP Server with {args.transport} transport")
+    logger.info("Starting openEHR MCP Server with %s transport", args.transport)
     
     # Get the transport plugin
     transport_plugin = get_transport_plugin(args.transport)
     if not transport_plugin:
-        logger.error(f"Unknown transport: {args.transport}")
-        logger.info(f"Available transports: {', '.join(list_transport_plugins())}")
+        logger.error("Unknown transport: %s", args.transport)
+        logger.info("Available transports: %s", ', '.join(list_transport_plugins()))
         sys.exit(1)
     
     # Run with the selected transport
     try:
-        transport_plugin.run(mcp, **vars(args))
+        transport_plugin.run(build_mcp(), **vars(args))
     except Exception as e:
-        logger.error(f"Error running transport {args.transport}: {e}")
+        logger.error("Error running transport %s: %s", args.transport, e)
         sys.exit(1)
\ No newline at end of file
@@ -1,12 +1,73 @@
 import os
 import sys
 import pytest
+import pytest_asyncio
 import asyncio
 from pathlib import Path
 
+# Project root and source directory, resolved once for the whole test session
+ROOT = Path(__file__).resolve().parent.parent
+SRC = ROOT / "src"
+
 # Add the src directory to the Python path
-sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+sys.path.insert(0, str(SRC))
+
+from ehrbase import EHRbaseClient
+
+# Template ID for testing
+VITAL_SIGNS_TEMPLATE_ID = "vital_signs_basic.v1"
+
+# EHR ID that never exists, checked with a bodiless HEAD request to warm up the connection
+WARM_UP_EHR_ID = "00000000-0000-0000-0000-000000000000"
+
+# Run the tests on uvloop when it is installed, like the ehrbase scripts do.
+# pytest-asyncio creates its session event loop from the current policy.
+try:
+    import uvloop
+except ImportError:
+    pass
+else:
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
 
 # We don't need to define an event_loop fixture anymore
 # pytest-asyncio provides this fixture by default
-# Tests should use @pytest.mark.asyncio(scope="function") to specify the scope
+# Tests run on the session event loop (see pytest.ini) so they can share one client
+
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def ehrbase_client():
+    """
+    Provide a single EHRbaseClient for the whole test session.
+    
+    The client keeps one pooled httpx connection to EHRbase, so sharing it across
+    tests reuses keep-alive connections instead of reconnecting in every module.
+    The connection is opened (and HTTP/2 negotiated, if the server supports it)
+    before the first test, so its setup cost is not charged to that test.
+    """
+    client = EHRbaseClient()
+    await client.ehr_exists(WARM_UP_EHR_ID)
+    yield client
+    await client.aclose()
+
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def vital_signs_example(ehrbase_client):
+    """
+    Provide the vital signs template example composition, fetched once per session.
+    
+    The example is a flat composition with immutable leaf values, so tests take a
+    shallow copy before modifying it.
+    """
+    return await ehrbase_client.get_template_example(VITAL_SIGNS_TEMPLATE_ID)
+
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def shared_ehr_id(ehrbase_client):
+    """
+    Provide the ID of one test EHR shared by tests that only add and remove compositions.
+    
+    The EHR is created once per session and deleted at teardown. Tests that check
+    EHR deletion itself create their own EHR instead.
+    """
+    ehr_response = await ehrbase_client.create_ehr()
+    assert "ehr_id" in ehr_response, f"Expected 'ehr_id' in response: {ehr_response}"
+    ehr_id = ehr_response["ehr_id"]
+    yield ehr_id
+    await ehrbase_client.delete_ehr(ehr_id)
@@ -0,0 +1,136 @@
+"""
+Test for batched composition creation using the CompositionClient.
+
+These tests run against an in-process httpx.MockTransport instead of the EHRbase
+server, so batch sizes, flush timing and individual failures can be controlled.
+"""
+import asyncio
+import httpx
+import orjson
+import pytest
+import sys
+import time
+from pathlib import Path
+
+# Under pytest, conftest.py adds the src directory to the path; add it when run directly
+if __name__ == "__main__":
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from ehrbase import EHRbaseClient
+
+# EHR and template used for the batched compositions
+EHR_ID = "batch-test-ehr"
+VITAL_SIGNS_TEMPLATE_ID = "vital_signs_basic.v1"
+
+# Flat paths of the test compositions; compositions with FAIL_KEY set are rejected
+INDEX_KEY = f"{VITAL_SIGNS_TEMPLATE_ID}/index"
+FAIL_KEY = f"{VITAL_SIGNS_TEMPLATE_ID}/fail"
+
+# Long enough that a batch flushed by size is never flushed by its timer instead
+NEVER_MS = 10_000
+
+def composition_handler(request):
+    """Answer composition POSTs with the composition's index, or 422 if it is marked to fail."""
+    composition = orjson.loads(request.content)
+    if composition.get(FAIL_KEY):
+        return httpx.Response(422, json={"error": "Unprocessable Entity"})
+    return httpx.Response(201, json={"uid": composition[INDEX_KEY]})
+
+def compositions(*indexes):
+    """Build flat test compositions with the given indexes."""
+    return [{INDEX_KEY: index} for index in indexes]
+
+def batching_client():
+    """
+    Create a client on the mock transport that records the size of each batch it sends.
+    
+    Returns:
+        Tuple of (client, batch_sizes)
+    """
+    client = EHRbaseClient(transport=httpx.MockTransport(composition_handler))
+    composition_client = client.compositions
+    create_many = composition_client._create_many
+    batch_sizes = []
+    
+    async def recording_create_many(ehr_id, batch, *args, **kwargs):
+        batch_sizes.append(len(batch))
+        return await create_many(ehr_id, batch, *args, **kwargs)
+    
+    composition_client._create_many = recording_create_many
+    return client, batch_sizes
+
+@pytest.mark.fast
+@pytest.mark.asyncio
+async def test_batch_flushed_by_size():
+    """Test that full batches are sent right away, without waiting for the timer."""
+    client, batch_sizes = batching_client()
+    async with client:
+        results = await asyncio.wait_for(
+            client.compositions.create_compositions_batched(EHR_ID, compositions(0, 1, 2, 3), max_batch=2, max_wait_ms=NEVER_MS),
+            timeout=5
+        )
+    
+    assert [result["uid"] for result in results] == [0, 1, 2, 3]
+    assert batch_sizes == [2, 2], f"Expected two full batches, got {batch_sizes}"
+    print(f"Successfully flushed batches by size: {batch_sizes}")
+
+@pytest.mark.fast
+@pytest.mark.asyncio
+async def test_batch_flushed_by_timeout():
+    """Test that a partial batch is sent once max_wait_ms has passed."""
+    client, batch_sizes = batching_client()
+    async with client:
+        start = time.monotonic()
+        results = await client.compositions.create_compositions_batched(EHR_ID, compositions(0, 1, 2), max_batch=100, max_wait_ms=20)
+        elapsed = time.monotonic() - start
+    
+    assert [result["uid"] for result in results] == [0, 1, 2]
+    assert batch_sizes == [3], f"Expected one batch of 3, got {batch_sizes}"
+    assert elapsed >= 0.02, f"Batch was sent after {elapsed:.3f}s, before max_wait_ms"
+    print(f"Successfully flushed a partial batch after {elapsed:.3f}s")
+
+@pytest.mark.fast
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_batch():
+    """Test that concurrent callers are coalesced into one batch and get their own results."""
+    client, batch_sizes = batching_client()
+    async with client:
+        first, second = await asyncio.gather(
+            client.compositions.create_compositions_batched(EHR_ID, compositions(0, 1), max_batch=3, max_wait_ms=NEVER_MS),
+            client.compositions.create_compositions_batched(EHR_ID, compositions(2), max_batch=3, max_wait_ms=NEVER_MS)
+        )
+    
+    assert batch_sizes == [3], f"Expected both callers in one batch, got {batch_sizes}"
+    assert [result["uid"] for result in first] == [0, 1], f"Wrong results for the first caller: {first}"
+    assert [result["uid"] for result in second] == [2], f"Wrong results for the second caller: {second}"
+    print("Successfully shared one batch between two callers")
+
+@pytest.mark.fast
+@pytest.mark.asyncio
+async def test_batch_item_failure():
+    """Test that one failed composition is reported without losing the other results."""
+    client, _ = batching_client()
+    batch = compositions(0, 1, 2)
+    batch[1][FAIL_KEY] = True
+    
+    async with client:
+        results = await client.compositions.create_compositions_batched(EHR_ID, batch, max_batch=3, return_exceptions=True)
+        assert results[0]["uid"] == 0 and results[2]["uid"] == 2, f"Expected the other compositions to be created: {results}"
+        assert isinstance(results[1], httpx.HTTPStatusError), f"Expected an HTTP error for the failed composition, got {results[1]!r}"
+        assert results[1].response.status_code == 422
+        
+        # Without return_exceptions the failure is raised once all results are in
+        with pytest.raises(httpx.HTTPStatusError):
+            await client.compositions.create_compositions_batched(EHR_ID, batch, max_batch=3)
+    
+    print("Successfully reported a failed composition alongside the created ones")
+
+async def main():
+    """Run the tests directly for debugging."""
+    await test_batch_flushed_by_size()
+    await test_batch_flushed_by_timeout()
+    await test_concurrent_callers_share_batch()
+    await test_batch_item_failure()
+
+if __name__ == "__main__":
+    asyncio.run(main())
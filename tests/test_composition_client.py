@@ -6,26 +6,150 @@ in a single integrated test flow, ensuring all operations work correctly and
 no resources are left behind on the EHRbase server.
 """
 import asyncio
-import os
-import json
+import orjson
 import pytest
 import sys
 from datetime import datetime
+from types import MappingProxyType
+from pathlib import Path
 
-# Add the parent directory to the path so we can import the src modules
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Under pytest, conftest.py adds the src directory to the path; add it when run directly
+if __name__ == "__main__":
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
 
 # Import the EHRbaseClient
-from src.ehrbase import EHRbaseClient
-
-# Initialize the client
-ehrbase_client = EHRbaseClient()
+from ehrbase import EHRbaseClient
 
 # Template ID for testing
 VITAL_SIGNS_TEMPLATE_ID = "vital_signs_basic.v1"
 
+# Prefix shared by every flat path of the vital signs template
+FLAT_PREFIX = f"{VITAL_SIGNS_TEMPLATE_ID}/"
+
+# Flat paths checked by the tests
+UID_KEY = FLAT_PREFIX + "_uid"
+HEART_RATE_KEY = FLAT_PREFIX + "pulse_heart_beat/rate|magnitude"
+SYSTOLIC_KEY = FLAT_PREFIX + "blood_pressure/systolic|magnitude"
+DIASTOLIC_KEY = FLAT_PREFIX + "blood_pressure/diastolic|magnitude"
+SPO2_NUMERATOR_KEY = FLAT_PREFIX + "pulse_oximetry/spo|numerator"
+
+# Custom values applied to the template example
+EXAMPLE_VALUES = {
+    HEART_RATE_KEY: 75.0,  # Heart rate of 75 bpm
+    SYSTOLIC_KEY: 125.0,  # Systolic BP of 125 mmHg
+    DIASTOLIC_KEY: 82.0,  # Diastolic BP of 82 mmHg
+    SPO2_NUMERATOR_KEY: 98.0  # SpO2 of 98%
+}
+
+# Flat JSON composition data for vital signs as (path, value) pairs relative to
+# FLAT_PREFIX; BASE_VITAL_SIGNS is built from them once at import
+_VITAL_SIGNS_PATHS = (
+    ("category|code", "433"),
+    ("category|value", "event"),
+    ("category|terminology", "openehr"),
+    ("context/start_time", "2025-04-14T00:00:00"),
+    ("context/setting|code", "225"),
+    ("context/setting|value", "home"),
+    ("context/setting|terminology", "openehr"),
+    
+    # Pulse/heart rate data
+    ("pulse_heart_beat/rate|magnitude", 62.0),
+    ("pulse_heart_beat/rate|unit", "/min"),
+    ("pulse_heart_beat/time", "2025-04-14T00:00:00"),
+    ("pulse_heart_beat/language|code", "en"),
+    ("pulse_heart_beat/language|terminology", "ISO_639-1"),
+    ("pulse_heart_beat/encoding|code", "UTF-8"),
+    ("pulse_heart_beat/encoding|terminology", "IANA_character-sets"),
+    
+    # Blood pressure data
+    ("blood_pressure/systolic|magnitude", 128.0),
+    ("blood_pressure/systolic|unit", "mm[Hg]"),
+    ("blood_pressure/diastolic|magnitude", 80.0),
+    ("blood_pressure/diastolic|unit", "mm[Hg]"),
+    ("blood_pressure/time", "2025-04-14T00:00:00"),
+    ("blood_pressure/language|code", "en"),
+    ("blood_pressure/language|terminology", "ISO_639-1"),
+    ("blood_pressure/encoding|terminology", "IANA_character-sets"),
+    ("blood_pressure/encoding|code", "UTF-8"),
+    
+    # SpO2 data
+    ("pulse_oximetry/spo", 0.99),
+    ("pulse_oximetry/spo|type", 3),
+    ("pulse_oximetry/spo|numerator", 99.0),
+    ("pulse_oximetry/spo|denominator", 100.0),
+    ("pulse_oximetry/time", "2025-04-14T00:00:00"),
+    ("pulse_oximetry/language|code", "en"),
+    ("pulse_oximetry/language|terminology", "ISO_639-1"),
+    ("pulse_oximetry/encoding|code", "UTF-8"),
+    ("pulse_oximetry/encoding|terminology", "IANA_character-sets"),
+    
+    # Height data
+    ("height_length/height_length|magnitude", 192.0),
+    ("height_length/height_length|unit", "cm"),
+    ("height_length/time", "2025-04-14T00:00:00"),
+    ("height_length/language|code", "en"),
+    ("height_length/language|terminology", "ISO_639-1"),
+    ("height_length/encoding|code", "UTF-8"),
+    ("height_length/encoding|terminology", "IANA_character-sets"),
+    
+    # Weight data
+    ("body_weight/weight|magnitude", 84.0),
+    ("body_weight/weight|unit", "kg"),
+    ("body_weight/time", "2025-04-14T00:00:00"),
+    ("body_weight/language|code", "en"),
+    ("body_weight/language|terminology", "ISO_639-1"),
+    ("body_weight/encoding|code", "UTF-8"),
+    ("body_weight/encoding|terminology", "IANA_character-sets"),
+    
+    # Required composition metadata
+    ("language|code", "en"),
+    ("language|terminology", "ISO_639-1"),
+    ("territory|terminology", "ISO_3166-1"),
+    ("territory|code", "US"),
+    ("composer|name", "Test User")
+)
+
+# Read-only views shared by all tests; copy with dict() before modifying
+BASE_VITAL_SIGNS = MappingProxyType({FLAT_PREFIX + path: value for path, value in _VITAL_SIGNS_PATHS})
+
+# Vital signs after the lifecycle test's update
+UPDATED_VITAL_SIGNS = MappingProxyType({
+    **BASE_VITAL_SIGNS,
+    HEART_RATE_KEY: 70.0,  # Changed from 62
+    SYSTOLIC_KEY: 130.0,  # Changed from 128
+    DIASTOLIC_KEY: 85.0  # Changed from 80
+})
+
+# Both compositions encoded once; the client sends bytes without serializing them again.
+# orjson does not serialize mapping proxies, so the underlying dicts are copied here.
+BASE_VITAL_SIGNS_JSON = orjson.dumps(dict(BASE_VITAL_SIGNS))
+UPDATED_VITAL_SIGNS_JSON = orjson.dumps(dict(UPDATED_VITAL_SIGNS))
+
+def apply_example_values(example):
+    """
+    Return a copy of the template example with EXAMPLE_VALUES applied.
+    
+    Args:
+        example: The flat template example composition
+        
+    Returns:
+        The modified copy
+    """
+    if EXAMPLE_VALUES.keys() <= example.keys():
+        # The example uses the template ID as flat path prefix, so one merge sets all values
+        return {**example, **EXAMPLE_VALUES}
+    
+    # Fall back to searching keys containing the vital signs paths
+    modified_example = example.copy()
+    for key in modified_example.keys():
+        for flat_path, value in EXAMPLE_VALUES.items():
+            if flat_path[len(FLAT_PREFIX):] in key:
+                modified_example[key] = value
+    return modified_example
+
+@pytest.mark.full
 @pytest.mark.asyncio
-async def test_composition_lifecycle():
+async def test_composition_lifecycle(ehrbase_client):
     """
     Test the complete composition lifecycle in a single test.
     
@@ -56,131 +180,55 @@ async def test_composition_lifecycle():
     # PART 1: CREATE A NEW COMPOSITION
     print("\n=== TESTING COMPOSITION CREATION ===")
     
-    # Create flat JSON composition data for vital signs
-    composition_data = {
-        f"{VITAL_SIGNS_TEMPLATE_ID}/category|code": "433",
-        f"{VITAL_SIGNS_TEMPLATE_ID}/category|value": "event",
-        f"{VITAL_SIGNS_TEMPLATE_ID}/category|terminology": "openehr",
-        f"{VITAL_SIGNS_TEMPLATE_ID}/context/start_time": "2025-04-14T00:00:00",
-        f"{VITAL_SIGNS_TEMPLATE_ID}/context/setting|code": "225",
-        f"{VITAL_SIGNS_TEMPLATE_ID}/context/setting|value": "home",
-        f"{VITAL_SIGNS_TEMPLATE_ID}/context/setting|terminology": "openehr",
-        
-        # Pulse/heart rate data
-        f"{VITAL_SIGNS_TEMPLATE_ID}/pulse_heart_beat/rate|magnitude": 62.0,
-        f"{VITAL_SIGNS_TEMPLATE_ID}/pulse_heart_beat/rate|unit": "/min",
-        f"{VITAL_SIGNS_TEMPLATE_ID}/pulse_heart_beat/time": "2025-04-14T00:00:00",
-        f"{VITAL_SIGNS_TEMPLATE_ID}/pulse_heart_beat/language|code": "en",
-        f"{VITAL_SIGNS_TEMPLATE_ID}/pulse_heart_beat/language|terminology": "ISO_639-1",
-        f"{VITAL_SIGNS_TEMPLATE_ID}/pulse_heart_beat/encoding|code": "UTF-8",
-        f"{VITAL_SIGNS_TEMPLATE_ID}/pulse_heart_beat/encoding|terminology": "IANA_character-sets",
-        
-        # Blood pressure data
-        f"{VITAL_SIGNS_TEMPLATE_ID}/blood_pressure/systolic|magnitude": 128.0,
-        f"{VITAL_SIGNS_TEMPLATE_ID}/blood_pressure/systolic|unit": "mm[Hg]",
-        f"{VITAL_SIGNS_TEMPLATE_ID}/blood_pressure/diastolic|magnitude": 80.0,
-        f"{VITAL_SIGNS_TEMPLATE_ID}/blood_pressure/diastolic|unit": "mm[Hg]",
-        f"{VITAL_SIGNS_TEMPLATE_ID}/blood_pressure/time": "2025-04-14T00:00:00",
-        f"{VITAL_SIGNS_TEMPLATE_ID}/blood_pressure/language|code": "en",
-        f"{VITAL_SIGNS_TEMPLATE_ID}/blood_pressure/language|terminology": "ISO_639-1",
-        f"{VITAL_SIGNS_TEMPLATE_ID}/blood_pressure/encoding|terminology": "IANA_character-sets",
-        f"{VITAL_SIGNS_TEMPLATE_ID}/blood_pressure/encoding|code": "UTF-8",
-        
-        # SpO2 data
-        f"{VITAL_SIGNS_TEMPLATE_ID}/pulse_oximetry/spo": 0.99,
-        f"{VITAL_SIGNS_TEMPLATE_ID}/pulse_oximetry/spo|type": 3,
-        f"{VITAL_SIGNS_TEMPLATE_ID}/pulse_oximetry/spo|numerator": 99.0,
-        f"{VITAL_SIGNS_TEMPLATE_ID}/pulse_oximetry/spo|denominator": 100.0,
-        f"{VITAL_SIGNS_TEMPLATE_ID}/pulse_oximetry/time": "2025-04-14T00:00:00",
-        f"{VITAL_SIGNS_TEMPLATE_ID}/pulse_oximetry/language|code": "en",
-        f"{VITAL_SIGNS_TEMPLATE_ID}/pulse_oximetry/language|terminology": "ISO_639-1",
-        f"{VITAL_SIGNS_TEMPLATE_ID}/pulse_oximetry/encoding|code": "UTF-8",
-        f"{VITAL_SIGNS_TEMPLATE_ID}/pulse_oximetry/encoding|terminology": "IANA_character-sets",
-        
-        # Height data
-        f"{VITAL_SIGNS_TEMPLATE_ID}/height_length/height_length|magnitude": 192.0,
-        f"{VITAL_SIGNS_TEMPLATE_ID}/height_length/height_length|unit": "cm",
-        f"{VITAL_SIGNS_TEMPLATE_ID}/height_length/time": "2025-04-14T00:00:00",
-        f"{VITAL_SIGNS_TEMPLATE_ID}/height_length/language|code": "en",
-        f"{VITAL_SIGNS_TEMPLATE_ID}/height_length/language|terminology": "ISO_639-1",
-        f"{VITAL_SIGNS_TEMPLATE_ID}/height_length/encoding|code": "UTF-8",
-        f"{VITAL_SIGNS_TEMPLATE_ID}/height_length/encoding|terminology": "IANA_character-sets",
-        
-        # Weight data
-        f"{VITAL_SIGNS_TEMPLATE_ID}/body_weight/weight|magnitude": 84.0,
-        f"{VITAL_SIGNS_TEMPLATE_ID}/body_weight/weight|unit": "kg",
-        f"{VITAL_SIGNS_TEMPLATE_ID}/body_weight/time": "2025-04-14T00:00:00",
-        f"{VITAL_SIGNS_TEMPLATE_ID}/body_weight/language|code": "en",
-        f"{VITAL_SIGNS_TEMPLATE_ID}/body_weight/language|terminology": "ISO_639-1",
-        f"{VITAL_SIGNS_TEMPLATE_ID}/body_weight/encoding|code": "UTF-8",
-        f"{VITAL_SIGNS_TEMPLATE_ID}/body_weight/encoding|terminology": "IANA_character-sets",
-        
-        # Required composition metadata
-        f"{VITAL_SIGNS_TEMPLATE_ID}/language|code": "en",
-        f"{VITAL_SIGNS_TEMPLATE_ID}/language|terminology": "ISO_639-1",
-        f"{VITAL_SIGNS_TEMPLATE_ID}/territory|terminology": "ISO_3166-1",
-        f"{VITAL_SIGNS_TEMPLATE_ID}/territory|code": "US",
-        f"{VITAL_SIGNS_TEMPLATE_ID}/composer|name": "Test User"
-    }
-    
-    # Create the composition using the client
+    # Create the composition from the flat JSON vital signs data using the client
     create_response = await ehrbase_client.create_composition(
         ehr_id, 
-        composition_data
+        BASE_VITAL_SIGNS_JSON,
+        template_id=VITAL_SIGNS_TEMPLATE_ID
     )
     
     # Basic validation of the create response
     assert create_response is not None, "No composition creation response received"
     
     # Extract and validate the composition UID
-    uid_key = f"{VITAL_SIGNS_TEMPLATE_ID}/_uid"
-    assert uid_key in create_response, f"Expected {uid_key} in response, got: {list(create_response.keys())}"
-    composition_uid = create_response[uid_key]
+    assert UID_KEY in create_response, f"Expected {UID_KEY} in response, got: {list(create_response.keys())}"
+    composition_uid = create_response[UID_KEY]
     
     # Validate heart rate value in the created composition
-    heart_rate_key = f"{VITAL_SIGNS_TEMPLATE_ID}/pulse_heart_beat/rate|magnitude"
-    assert heart_rate_key in create_response, f"Expected {heart_rate_key} in response"
-    assert create_response[heart_rate_key] == 62.0, "Expected heart rate to be 62.0"
+    assert HEART_RATE_KEY in create_response, f"Expected {HEART_RATE_KEY} in response"
+    assert create_response[HEART_RATE_KEY] == 62.0, "Expected heart rate to be 62.0"
     
     print(f"Successfully created composition with UID: {composition_uid}")
     
     # PART 2: UPDATE THE COMPOSITION
     print("\n=== TESTING COMPOSITION UPDATE ===")
     
-    # Create updated data with modified vital signs
-    update_data = composition_data.copy()
-    update_data[f"{VITAL_SIGNS_TEMPLATE_ID}/pulse_heart_beat/rate|magnitude"] = 70.0  # Changed from 62
-    update_data[f"{VITAL_SIGNS_TEMPLATE_ID}/blood_pressure/systolic|magnitude"] = 130.0  # Changed from 128
-    update_data[f"{VITAL_SIGNS_TEMPLATE_ID}/blood_pressure/diastolic|magnitude"] = 85.0  # Changed from 80
-    
-    # Update the composition
+    # Update the composition with the modified vital signs
     update_response = await ehrbase_client.update_composition(
         ehr_id, 
         composition_uid, 
-        update_data
+        UPDATED_VITAL_SIGNS_JSON,
+        template_id=VITAL_SIGNS_TEMPLATE_ID
     )
     
     # Basic validation of the update response
     assert update_response is not None, "No composition update response received"
     
     # Ensure the UID was updated (should have a new version)
-    assert uid_key in update_response, f"Expected {uid_key} in update response"
-    updated_uid = update_response[uid_key]
+    assert UID_KEY in update_response, f"Expected {UID_KEY} in update response"
+    updated_uid = update_response[UID_KEY]
     assert updated_uid != composition_uid, "Expected new version UID after update"
     
     # Validate the updated heart rate
-    assert heart_rate_key in update_response, f"Expected {heart_rate_key} in update response"
-    assert update_response[heart_rate_key] == 70.0, f"Expected updated heart rate to be 70.0, got {update_response[heart_rate_key]}"
+    assert HEART_RATE_KEY in update_response, f"Expected {HEART_RATE_KEY} in update response"
+    assert update_response[HEART_RATE_KEY] == 70.0, f"Expected updated heart rate to be 70.0, got {update_response[HEART_RATE_KEY]}"
     
     # Validate the updated blood pressure
-    systolic_key = f"{VITAL_SIGNS_TEMPLATE_ID}/blood_pressure/systolic|magnitude"
-    diastolic_key = f"{VITAL_SIGNS_TEMPLATE_ID}/blood_pressure/diastolic|magnitude"
-    
-    assert systolic_key in update_response, f"Expected {systolic_key} in update response"
-    assert update_response[systolic_key] == 130.0, f"Expected systolic to be 130.0, got {update_response[systolic_key]}"
+    assert SYSTOLIC_KEY in update_response, f"Expected {SYSTOLIC_KEY} in update response"
+    assert update_response[SYSTOLIC_KEY] == 130.0, f"Expected systolic to be 130.0, got {update_response[SYSTOLIC_KEY]}"
     
-    assert diastolic_key in update_response, f"Expected {diastolic_key} in update response"
-    assert update_response[diastolic_key] == 85.0, f"Expected diastolic to be 85.0, got {update_response[diastolic_key]}"
+    assert DIASTOLIC_KEY in update_response, f"Expected {DIASTOLIC_KEY} in update response"
+    assert update_response[DIASTOLIC_KEY] == 85.0, f"Expected diastolic to be 85.0, got {update_response[DIASTOLIC_KEY]}"
     
     print(f"Successfully updated composition, new UID: {updated_uid}")
     
@@ -210,70 +258,42 @@ async def test_composition_lifecycle():
     assert delete_ehr_result is True, f"Failed to delete EHR with ID {ehr_id}"
     print(f"Successfully deleted test EHR with ID: {ehr_id}")
     
-    # Verify the EHR is no longer accessible
-    try:
-        # Try to get the deleted EHR
-        verification_response = await ehrbase_client.get_ehr(ehr_id)
-        assert False, f"Expected 404 error when getting deleted EHR, but got response: {verification_response}"
-    except Exception as e:
-        # We expect an exception
-        print(f"Got expected exception when getting deleted EHR: {str(e)}")
-        assert "404" in str(e) or "Not Found" in str(e), f"Expected 404 Not Found error, got: {str(e)}"
+    # Verify the EHR is no longer accessible (HEAD request, no body to parse)
+    assert not await ehrbase_client.ehr_exists(ehr_id), f"Expected deleted EHR {ehr_id} to no longer exist"
     
     print("Successfully verified that the EHR was deleted")
     print("\n=== COMPOSITION LIFECYCLE TEST COMPLETED SUCCESSFULLY ===")
     return True
 
+@pytest.mark.full
 @pytest.mark.asyncio
-async def test_composition_from_template_example():
+async def test_composition_from_template_example(ehrbase_client, vital_signs_example, shared_ehr_id):
     """
     Test creating a composition using an example generated from the template.
     
     This test demonstrates the integration between template and composition operations
     and exercises the workflow a client would typically use:
-    1. Create a new EHR for testing
-    2. Get example composition from template
-    3. Modify the example with custom values
-    4. Create a composition with the modified example
-    5. Clean up by deleting the composition
-    6. Clean up by deleting the EHR
-    """
-    # PART 0: CREATE A NEW EHR FOR TESTING
-    print("\n=== CREATING TEST EHR ===")
-    
-    # Create a simple EHR for testing
-    ehr_response = await ehrbase_client.create_ehr()
-    
-    # Verify we received a valid response
-    assert ehr_response is not None, "No EHR creation response received"
-    assert "ehr_id" in ehr_response, f"Expected 'ehr_id' in response: {ehr_response}"
+    1. Get example composition from template
+    2. Modify the example with custom values
+    3. Create a composition with the modified example
+    4. Clean up by deleting the composition
     
-    # Store the EHR ID for subsequent operations
-    ehr_id = ehr_response["ehr_id"]
-    print(f"Successfully created test EHR with ID: {ehr_id}")
+    The composition is created in the session's shared test EHR, which is
+    deleted by the shared_ehr_id fixture.
+    """
+    ehr_id = shared_ehr_id
     
     print("\n=== TESTING COMPOSITION FROM TEMPLATE EXAMPLE ===")
     
-    # Step 1: Generate example composition from template
-    example = await ehrbase_client.get_template_example(VITAL_SIGNS_TEMPLATE_ID)
+    # Step 1: Use the example composition generated from the template (fetched once per session)
+    example = vital_signs_example
     
     # Verify we received a valid example
     assert example is not None, "No example composition received"
     assert isinstance(example, dict), f"Expected dictionary for example, got {type(example)}"
     
-    # Step 2: Find and modify vital signs values in the example
-    modified_example = example.copy()
-    
-    # Find keys containing vital signs elements (search by pattern)
-    for key in modified_example.keys():
-        if "pulse_heart_beat/rate|magnitude" in key:
-            modified_example[key] = 75.0  # Set heart rate to 75 bpm
-        elif "blood_pressure/systolic|magnitude" in key:
-            modified_example[key] = 125.0  # Set systolic BP to 125 mmHg
-        elif "blood_pressure/diastolic|magnitude" in key:
-            modified_example[key] = 82.0  # Set diastolic BP to 82 mmHg
-        elif "pulse_oximetry/spo|numerator" in key:
-            modified_example[key] = 98.0  # Set SpO2 to 98%
+    # Step 2: Modify vital signs values in a copy of the shared example
+    modified_example = apply_example_values(example)
     
     # Step 3: Create composition with the modified example
     create_response = await ehrbase_client.create_composition(
@@ -285,14 +305,13 @@ async def test_composition_from_template_example():
     assert create_response is not None, "No composition creation response received"
     
     # Extract the composition UID for deletion
-    uid_key = None
-    for key in create_response.keys():
-        if key.endswith("/_uid"):
-            uid_key = key
-            break
-    
-    assert uid_key is not None, "Could not find _uid key in response"
-    composition_uid = create_response[uid_key]
+    try:
+        composition_uid = create_response[UID_KEY]
+    except KeyError:
+        # Fall back to scanning for a _uid key under a different flat path prefix
+        composition_uid = next((value for key, value in create_response.items() if key.endswith("/_uid")), None)
+    
+    assert composition_uid is not None, "Could not find _uid key in response"
     print(f"Successfully created composition with UID: {composition_uid}")
     
     # Step 4: Delete the composition to clean up
@@ -308,20 +327,133 @@ async def test_composition_from_template_example():
     
     print("Successfully deleted composition")
     
-    # PART 5: DELETE THE TEST EHR
-    print("\n=== CLEANING UP - DELETING TEST EHR ===")
+    print("\n=== TEMPLATE EXAMPLE TEST COMPLETED SUCCESSFULLY ===")
+    return True
+
+@pytest.mark.asyncio
+async def test_create_compositions_bulk(ehrbase_client, vital_signs_example, shared_ehr_id):
+    """
+    Test creating several compositions concurrently in one EHR.
     
-    # Delete the EHR using the admin API
-    delete_ehr_result = await ehrbase_client.delete_ehr(ehr_id)
+    This test validates that bulk creation returns one response per composition,
+    in the order the compositions were submitted. The compositions are created in
+    the session's shared test EHR.
+    """
+    print("\n=== TESTING BULK COMPOSITION CREATION ===")
     
-    # Verify the deletion was successful
-    assert delete_ehr_result is True, f"Failed to delete EHR with ID {ehr_id}"
-    print(f"Successfully deleted test EHR with ID: {ehr_id}")
+    ehr_id = shared_ehr_id
     
-    print("\n=== TEMPLATE EXAMPLE TEST COMPLETED SUCCESSFULLY ===")
+    # Build compositions with distinct heart rates from the template example
+    example = vital_signs_example
+    heart_rates = [60.0, 65.0, 70.0]
+    compositions = [{**example, HEART_RATE_KEY: heart_rate} for heart_rate in heart_rates]
+    
+    # Create all compositions concurrently
+    create_responses = await ehrbase_client.create_compositions(ehr_id, compositions)
+    assert len(create_responses) == len(compositions), f"Expected {len(compositions)} responses, got {len(create_responses)}"
+    
+    # Verify the responses are in submission order
+    for heart_rate, create_response in zip(heart_rates, create_responses):
+        assert UID_KEY in create_response, f"Expected {UID_KEY} in response, got: {list(create_response.keys())}"
+        assert create_response[HEART_RATE_KEY] == heart_rate, f"Expected heart rate {heart_rate}, got {create_response[HEART_RATE_KEY]}"
+    
+    print(f"Successfully created {len(create_responses)} compositions")
+    
+    # Read all compositions back concurrently
+    composition_uids = [create_response[UID_KEY] for create_response in create_responses]
+    get_responses = await ehrbase_client.get_compositions(ehr_id, composition_uids)
+    for heart_rate, get_response in zip(heart_rates, get_responses):
+        assert get_response[HEART_RATE_KEY] == heart_rate, f"Expected heart rate {heart_rate}, got {get_response[HEART_RATE_KEY]}"
+    
+    print(f"Successfully retrieved {len(get_responses)} compositions")
+    
+    # Clean up the compositions concurrently; the shared EHR is deleted by its fixture
+    delete_responses = await asyncio.gather(
+        *(ehrbase_client.delete_composition(ehr_id, composition_uid) for composition_uid in composition_uids)
+    )
+    for delete_response in delete_responses:
+        assert delete_response["status"] == "success", f"Deletion failed: {delete_response}"
+    
+    print("\n=== BULK COMPOSITION TEST COMPLETED SUCCESSFULLY ===")
+    return True
+
+@pytest.mark.fast
+@pytest.mark.asyncio
+async def test_composition_combined(ehrbase_client, vital_signs_example, shared_ehr_id):
+    """
+    Test the composition workflow of the lifecycle and template example tests in one pass.
+    
+    This test validates, in the session's shared test EHR:
+    1. Creating a composition from the modified template example
+    2. Updating the composition with modified vital signs
+    3. Deleting the composition
+    
+    It covers the composition operations of both full tests with half their
+    round trips, for quick checks with `pytest -m fast`.
+    """
+    print("\n=== TESTING COMBINED COMPOSITION WORKFLOW ===")
+    
+    ehr_id = shared_ehr_id
+    
+    # Create a composition from the modified template example
+    modified_example = apply_example_values(vital_signs_example)
+    create_response = await ehrbase_client.create_composition(ehr_id, modified_example)
+    assert UID_KEY in create_response, f"Expected {UID_KEY} in response, got: {list(create_response.keys())}"
+    assert create_response[HEART_RATE_KEY] == EXAMPLE_VALUES[HEART_RATE_KEY], f"Expected heart rate {EXAMPLE_VALUES[HEART_RATE_KEY]}, got {create_response[HEART_RATE_KEY]}"
+    composition_uid = create_response[UID_KEY]
+    
+    # Update it with the lifecycle test's modified vital signs
+    update_data = {
+        **modified_example,
+        HEART_RATE_KEY: UPDATED_VITAL_SIGNS[HEART_RATE_KEY],
+        SYSTOLIC_KEY: UPDATED_VITAL_SIGNS[SYSTOLIC_KEY],
+        DIASTOLIC_KEY: UPDATED_VITAL_SIGNS[DIASTOLIC_KEY]
+    }
+    update_response = await ehrbase_client.update_composition(ehr_id, composition_uid, update_data)
+    updated_uid = update_response[UID_KEY]
+    assert updated_uid != composition_uid, "Expected new version UID after update"
+    for key in (HEART_RATE_KEY, SYSTOLIC_KEY, DIASTOLIC_KEY):
+        assert update_response[key] == update_data[key], f"Expected {key} to be {update_data[key]}, got {update_response[key]}"
+    
+    # Delete the composition; the shared EHR is deleted by its fixture
+    delete_response = await ehrbase_client.delete_composition(ehr_id, updated_uid)
+    assert delete_response["status"] == "success", f"Deletion failed: {delete_response}"
+    
+    print("\n=== COMBINED COMPOSITION TEST COMPLETED SUCCESSFULLY ===")
     return True
 
+async def run_composition_workflows(ehrbase_client, vital_signs_example):
+    """
+    Run the composition tests concurrently.
+    
+    The lifecycle test creates and deletes its own EHR; the other tests share one
+    test EHR, created and deleted here the way the shared_ehr_id fixture does.
+    None of the tests depend on each other, so their round trips to EHRbase can
+    overlap on one event loop.
+    
+    Args:
+        ehrbase_client: The shared EHRbaseClient
+        vital_signs_example: The vital signs template example composition
+        
+    Returns:
+        List with the result of each test
+    """
+    shared_ehr_id = (await ehrbase_client.create_ehr())["ehr_id"]
+    try:
+        return await asyncio.gather(
+            test_composition_lifecycle(ehrbase_client),
+            test_composition_from_template_example(ehrbase_client, vital_signs_example, shared_ehr_id),
+            test_create_compositions_bulk(ehrbase_client, vital_signs_example, shared_ehr_id),
+            test_composition_combined(ehrbase_client, vital_signs_example, shared_ehr_id)
+        )
+    finally:
+        await ehrbase_client.delete_ehr(shared_ehr_id)
+
+async def main():
+    """Execute the tests directly for debugging on one event loop and one client, like the session fixtures."""
+    async with EHRbaseClient() as ehrbase_client:
+        vital_signs_example = await ehrbase_client.get_template_example(VITAL_SIGNS_TEMPLATE_ID)
+        await run_composition_workflows(ehrbase_client, vital_signs_example)
+
 if __name__ == "__main__":
-    # Execute the tests directly for debugging
-    asyncio.run(test_composition_lifecycle())
-    asyncio.run(test_composition_from_template_example())
+    asyncio.run(main())
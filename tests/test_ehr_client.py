@@ -6,26 +6,32 @@ in a single integrated test flow, ensuring all operations work correctly
 with the EHRbase server.
 """
 import asyncio
+import httpx
 import os
-import json
+import orjson
 import pytest
-import copy
 import sys
 import uuid
 from datetime import datetime
+from pathlib import Path
 
-# Add the src directory to the path so we can import the modules
-src_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
-sys.path.insert(0, src_path)
+# Under pytest, conftest.py adds the src directory to the path; add it when run directly
+if __name__ == "__main__":
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
 
 # Import the EHRbaseClient
-from ehrbase import EHRbaseClient
+from ehrbase import EHRbaseClient, EHRNotFoundError
+
+# Print full response bodies only when TEST_VERBOSE=1
+VERBOSE = os.environ.get("TEST_VERBOSE") == "1"
 
-# Initialize the client
-ehrbase_client = EHRbaseClient()
+def dbg(label, obj):
+    """Print an object as indented JSON if VERBOSE is set."""
+    if VERBOSE:
+        print(f"{label}: {orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()}")
 
 @pytest.mark.asyncio
-async def test_ehr_lifecycle():
+async def test_ehr_lifecycle(ehrbase_client):
     """
     Test the complete EHR lifecycle in a single test.
     
@@ -66,7 +72,7 @@ async def test_ehr_lifecycle():
     
     # Create the EHR
     create_response = await ehrbase_client.create_ehr(ehr_status)
-    print(f"Create EHR response: {json.dumps(create_response, indent=2)}")
+    dbg("Create EHR response", create_response)
     
     # Verify we received a valid response
     assert create_response is not None, "No create EHR response received"
@@ -79,9 +85,12 @@ async def test_ehr_lifecycle():
     # PART 2: GET THE EHR BY ID
     print("\n=== TESTING EHR RETRIEVAL ===")
     
-    # Get the EHR by ID
-    get_response = await ehrbase_client.get_ehr(ehr_id)
-    print(f"Get EHR response: {json.dumps(get_response, indent=2)}")
+    # Get the EHR by ID and its status together; both only read the new EHR
+    get_response, status_response = await asyncio.gather(
+        ehrbase_client.get_ehr(ehr_id),
+        ehrbase_client.get_ehr_status(ehr_id)
+    )
+    dbg("Get EHR response", get_response)
     
     # Verify we received a valid response
     assert get_response is not None, "No get EHR response received"
@@ -93,9 +102,8 @@ async def test_ehr_lifecycle():
     # PART 3: GET THE EHR STATUS
     print("\n=== TESTING EHR STATUS RETRIEVAL ===")
     
-    # Get the EHR status
-    status_response = await ehrbase_client.get_ehr_status(ehr_id)
-    print(f"Get EHR status response: {json.dumps(status_response, indent=2)}")
+    # The EHR status was fetched alongside the EHR above
+    dbg("Get EHR status response", status_response)
     
     # Verify we received a valid response
     assert status_response is not None, "No get EHR status response received"
@@ -121,17 +129,26 @@ async def test_ehr_lifecycle():
     version_uid = status_response["uid"]["value"]
     print(f"Using version UID for update: {version_uid}")
     
-    # Create a copy of the status data to modify
-    updated_status = copy.deepcopy(status_response)
-    
-    # Update the subject ID in the copied status data
-    updated_status["subject"]["external_ref"]["id"]["value"] = new_subject_id
+    # Copy only the path down to the subject ID and set the new value; the rest of
+    # the status data is shared with status_response, which stays unchanged
+    subject = status_response["subject"]
+    external_ref = subject["external_ref"]
+    updated_status = {
+        **status_response,
+        "subject": {
+            **subject,
+            "external_ref": {
+                **external_ref,
+                "id": {**external_ref["id"], "value": new_subject_id}
+            }
+        }
+    }
     
     update_succeeded = False
     try:
         # Update the EHR status
         update_response = await ehrbase_client.update_ehr_status(ehr_id, updated_status, version_uid)
-        print(f"Update EHR status response: {json.dumps(update_response, indent=2)}")
+        dbg("Update EHR status response", update_response)
         
         # Verify we received a valid response
         assert update_response is not None, "No update EHR status response received"
@@ -170,7 +187,7 @@ async def test_ehr_lifecycle():
     # Get EHR by subject ID
     try:
         ehr_response = await ehrbase_client.get_ehr_by_subject_id(subject_id=subject_id, subject_namespace=subject_namespace)
-        print(f"Get EHR by subject response: {json.dumps(ehr_response, indent=2)}")
+        dbg("Get EHR by subject response", ehr_response)
         
         # Verify we received a valid response
         assert ehr_response is not None, "No EHR response received"
@@ -207,20 +224,13 @@ async def test_ehr_lifecycle():
     assert delete_result is True, f"Failed to delete EHR with ID {ehr_id}"
     print(f"Successfully deleted EHR with ID: {ehr_id}")
     
-    # Verify the EHR is no longer accessible
-    try:
-        # Try to get the deleted EHR
-        verification_response = await ehrbase_client.get_ehr(ehr_id)
-        assert False, f"Expected 404 error when getting deleted EHR, but got response: {verification_response}"
-    except Exception as e:
-        # We expect an exception
-        print(f"Got expected exception when getting deleted EHR: {str(e)}")
-        assert "404" in str(e) or "Not Found" in str(e), f"Expected 404 Not Found error, got: {str(e)}"
+    # Verify the EHR is no longer accessible (HEAD request, no body to parse)
+    assert not await ehrbase_client.ehr_exists(ehr_id), f"Expected deleted EHR {ehr_id} to no longer exist"
     
     print("Successfully verified that the EHR was deleted")
 
 @pytest.mark.asyncio
-async def test_ehr_not_found():
+async def test_ehr_not_found(ehrbase_client):
     """
     Test retrieving a non-existent EHR.
     
@@ -232,21 +242,57 @@ async def test_ehr_not_found():
     # Generate a random EHR ID that shouldn't exist
     non_existent_ehr_id = str(uuid.uuid4())
     
-    try:
-        # Try to get a non-existent EHR
-        response = await ehrbase_client.get_ehr(non_existent_ehr_id)
-        print(f"Get non-existent EHR response: {response}")
-        
-        # If we get here, the test should fail because we expected an exception
-        assert False, f"Expected an exception when getting non-existent EHR, but got response: {response}"
-    except Exception as e:
-        # We expect an exception
-        print(f"Got expected exception when getting non-existent EHR: {str(e)}")
-        assert "404" in str(e) or "Not Found" in str(e), f"Expected 404 Not Found error, got: {str(e)}"
+    # Try to get a non-existent EHR; the client raises a typed error for the 404
+    with pytest.raises(EHRNotFoundError) as exc_info:
+        await ehrbase_client.get_ehr(non_existent_ehr_id)
+    
+    assert exc_info.value.ehr_id == non_existent_ehr_id, f"Expected error for EHR {non_existent_ehr_id}, got {exc_info.value.ehr_id}"
+    print(f"Got expected exception when getting non-existent EHR: {exc_info.value}")
     
     print("Successfully verified that getting a non-existent EHR raises an appropriate exception")
 
+@pytest.mark.asyncio
+async def test_subject_cache_cleared_after_delete():
+    """
+    Test that a subject lookup overlapping an EHR deletion is not served from the cache.
+    
+    This runs against an in-process httpx.MockTransport, which holds the deletion
+    open until a subject lookup has returned the old EHR.
+    """
+    print("\n=== TESTING SUBJECT CACHE INVALIDATION ===")
+    
+    ehr_ids = ["ehr-before-delete"]
+    lookup_done = asyncio.Event()
+    
+    async def handler(request):
+        if request.method == "DELETE":
+            await lookup_done.wait()
+            ehr_ids[0] = "ehr-after-delete"
+            return httpx.Response(204)
+        return httpx.Response(200, json={"ehr_id": {"value": ehr_ids[0]}})
+    
+    async with EHRbaseClient(transport=httpx.MockTransport(handler)) as client:
+        async def lookup():
+            ehr = await client.get_ehr_by_subject_id("subject", "namespace")
+            lookup_done.set()
+            return ehr
+        
+        # The lookup completes while the deletion is still in flight
+        _, stale = await asyncio.gather(client.delete_ehr("ehr-before-delete"), lookup())
+        assert stale["ehr_id"]["value"] == "ehr-before-delete"
+        
+        # Once the deletion has completed, the old EHR must not be served again
+        fresh = await client.get_ehr_by_subject_id("subject", "namespace")
+        assert fresh["ehr_id"]["value"] == "ehr-after-delete", f"Deleted EHR served from the subject cache: {fresh}"
+    
+    print("Successfully verified that the subject cache is cleared after a deletion")
+
+async def main():
+    """Execute the tests directly for debugging on one event loop and one client, like the session fixture."""
+    async with EHRbaseClient() as ehrbase_client:
+        await test_ehr_lifecycle(ehrbase_client)
+        await test_ehr_not_found(ehrbase_client)
+    await test_subject_cache_cleared_after_delete()
+
 if __name__ == "__main__":
-    # Execute the tests directly for debugging
-    asyncio.run(test_ehr_lifecycle())
-    asyncio.run(test_ehr_not_found())
+    asyncio.run(main())
@@ -0,0 +1,110 @@
+"""
+Tests for the conditional GET validator cache and the retry policy of the EHRbaseHttpClient.
+
+These tests run against an in-process httpx.MockTransport instead of the EHRbase
+server, so they can answer revalidations with 304 Not Modified and fail attempts
+on demand.
+"""
+import asyncio
+import httpx
+import pytest
+import sys
+from pathlib import Path
+
+# Under pytest, conftest.py adds the src directory to the path; add it when run directly
+if __name__ == "__main__":
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from tenacity import wait_none
+from ehrbase.http_client import EHRbaseHttpClient
+
+# Resource served by the mock transport, with a fixed ETag
+STATUS_PATH = "openehr/v1/ehr/test/ehr_status"
+STATUS_ETAG = '"status-v1"'
+
+def revalidating_handler(request):
+    """Serve the resource, answering requests that carry its ETag with 304 Not Modified."""
+    if request.headers.get("If-None-Match") == STATUS_ETAG:
+        return httpx.Response(304, headers={"ETag": STATUS_ETAG})
+    return httpx.Response(200, json={"subject": {"id": "original"}}, headers={"ETag": STATUS_ETAG})
+
+@pytest.mark.asyncio
+async def test_revalidated_responses_are_not_shared():
+    """Test that changing a returned result does not change what later 304s return."""
+    async with EHRbaseHttpClient(transport=httpx.MockTransport(revalidating_handler)) as http_client:
+        first = await http_client.request(STATUS_PATH)
+        first["subject"]["id"] = "changed by caller"
+        
+        # Both of these are answered with 304 from the cached body
+        second = await http_client.request(STATUS_PATH)
+        assert second == {"subject": {"id": "original"}}, f"Cached response was changed by a caller: {second}"
+        
+        second["subject"]["id"] = "changed again"
+        third = await http_client.request(STATUS_PATH)
+        assert third == {"subject": {"id": "original"}}, f"Revalidated response was shared: {third}"
+    
+    print("Successfully confirmed that revalidated responses are parsed per caller")
+
+def failing_once_client(exc):
+    """
+    Create a client whose first attempt fails with exc and later attempts succeed.
+    
+    Returns:
+        Tuple of (http_client, requests)
+    """
+    requests = []
+    
+    def handler(request):
+        requests.append(request)
+        if len(requests) == 1:
+            raise exc(f"Simulated {exc.__name__}", request=request)
+        return httpx.Response(200, json={"attempt": len(requests)})
+    
+    http_client = EHRbaseHttpClient(transport=httpx.MockTransport(handler))
+    http_client.RETRY_WAIT = wait_none()
+    return http_client, requests
+
+@pytest.mark.asyncio
+async def test_dropped_connection_retried_for_reads():
+    """Test that GET and HEAD requests are retried when the connection drops."""
+    for exc in (httpx.RemoteProtocolError, httpx.ReadError):
+        http_client, requests = failing_once_client(exc)
+        async with http_client:
+            result = await http_client.request(STATUS_PATH)
+        
+        assert result == {"attempt": 2}, f"Expected the retried attempt's result after {exc.__name__}, got {result}"
+        assert len(requests) == 2, f"Expected one retry after {exc.__name__}, got {len(requests)} attempts"
+    
+    print("Successfully retried reads after dropped connections")
+
+@pytest.mark.asyncio
+async def test_conditional_update_not_retried():
+    """Test that an If-Match update is sent once, since a replay of an applied update fails with 412."""
+    http_client, requests = failing_once_client(httpx.ReadTimeout)
+    async with http_client:
+        with pytest.raises(httpx.ReadTimeout):
+            await http_client.request(STATUS_PATH, method="PUT", json_data={}, version_uid="ehr-status::1")
+    
+    assert len(requests) == 1, f"Expected the conditional update to be sent once, got {len(requests)} attempts"
+    print("Successfully sent a conditional update only once")
+
+@pytest.mark.asyncio
+async def test_delete_not_retried():
+    """Test that a DELETE is sent once after a read timeout, since a replay of an applied delete fails with 404."""
+    http_client, requests = failing_once_client(httpx.ReadTimeout)
+    async with http_client:
+        with pytest.raises(httpx.ReadTimeout):
+            await http_client.request(STATUS_PATH, method="DELETE")
+    
+    assert len(requests) == 1, f"Expected the delete to be sent once, got {len(requests)} attempts"
+    print("Successfully sent a delete only once")
+
+async def main():
+    """Run the tests directly for debugging."""
+    await test_revalidated_responses_are_not_shared()
+    await test_dropped_connection_retried_for_reads()
+    await test_conditional_update_not_retried()
+    await test_delete_not_retried()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,17 +1,19 @@
 """
 Simple integration test for the openEHR MCP Server.
 
-This test validates template retrieval from the EHRbase server.
+This test validates template retrieval from the EHRbase server, and the handling
+of partial failures in the bulk composition tool against a mock transport.
 """
 import os
 import sys
 import asyncio
+import httpx
+import orjson
 from pathlib import Path
 
-# Add the src directory to the Python path
-project_root = Path(__file__).parent.parent
-src_path = project_root / "src"
-sys.path.insert(0, str(src_path))
+# Under pytest, conftest.py adds the src directory to the Python path; add it when run directly
+if __name__ == "__main__":
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
 
 # Import the EHRbase client
 from ehrbase import EHRbaseClient
@@ -20,12 +22,10 @@ from ehrbase import EHRbaseClient
 EHRBASE_URL = os.environ.get("EHRBASE_URL", "http://localhost:8080/ehrbase/rest")
 
 
-async def test_template_list():
+async def test_template_list(ehrbase_client):
     """Test retrieving the list of templates from the EHRbase server."""
     print(f"\n=== TESTING TEMPLATE RETRIEVAL ===")
     
-    # Initialize the client
-    ehrbase_client = EHRbaseClient()
     print(f"Using EHRbase URL: {ehrbase_client.http_client.base_url}")
     
     try:
@@ -52,7 +52,28 @@ async def test_template_list():
         raise
 
 
+async def test_compositions_bulk_get_partial_failure(monkeypatch):
+    """Test that a composition that cannot be fetched is reported without failing the others."""
+    import openehr_mcp_server
+    
+    def handler(request):
+        if request.url.path.endswith("/query/aql"):
+            return httpx.Response(200, json={"rows": [["ehr-1", "uid-ok::1"], ["ehr-1", "uid-gone::1"]]})
+        if request.url.path.endswith("/uid-gone::1"):
+            return httpx.Response(404, json={"error": "Not Found"})
+        return httpx.Response(200, json={"vital_signs_basic.v1/_uid": "uid-ok::1"})
+    
+    async with EHRbaseClient(transport=httpx.MockTransport(handler)) as client:
+        monkeypatch.setattr(openehr_mcp_server, "ehrbase_client", client)
+        response = orjson.loads(await openehr_mcp_server.openehr_compositions_bulk_get("vital_signs_basic.v1"))
+    
+    ok, gone = response["compositions"]
+    assert response["total"] == 2 and response["failed"] == 1, f"Unexpected counts: {response}"
+    assert ok["composition"] == {"vital_signs_basic.v1/_uid": "uid-ok::1"}, f"Expected the fetched composition: {ok}"
+    assert gone["composition_uid"] == "uid-gone::1" and "404" in gone["error"], f"Expected an error for the missing composition: {gone}"
+    print("Successfully reported a missing composition next to its UID")
+
 if __name__ == "__main__":
     # Run the test directly
-    templates = asyncio.run(test_template_list())
+    templates = asyncio.run(test_template_list(EHRbaseClient()))
     print("\nTest completed successfully!")
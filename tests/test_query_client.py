@@ -5,41 +5,48 @@ This test validates the execution of ad-hoc AQL queries against the EHRbase serv
 """
 import asyncio
 import os
-import json
+import orjson
 import pytest
 import sys
+import uuid
 from typing import List
+from pathlib import Path
 
-# Add the src directory to the path so we can import the modules
-src_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
-sys.path.insert(0, src_path)
+# Under pytest, conftest.py adds the src directory to the path; add it when run directly
+if __name__ == "__main__":
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
 
 # Import the EHRbaseClient
 from ehrbase import EHRbaseClient
 
-# Initialize the client
-ehrbase_client = EHRbaseClient()
+# Query for all EHR IDs, run ad hoc and as a stored query
+EHR_IDS_QUERY = "SELECT e/ehr_id/value AS ehr_id FROM EHR e"
+EHR_IDS_QUERY_NAME = "org.ehrbase.test::ehr_ids"
+EHR_IDS_QUERY_VERSION = "1.0.0"
 
+# Print full response bodies only when TEST_VERBOSE=1
+VERBOSE = os.environ.get("TEST_VERBOSE") == "1"
 
-@pytest.mark.asyncio
-async def test_adhoc_query():
+def dbg(label, obj):
+    """Print an object as indented JSON if VERBOSE is set."""
+    if VERBOSE:
+        print(f"{label}: {orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()}")
+
+
+async def run_simple_query(ehrbase_client):
     """
-    Test executing ad-hoc AQL queries.
+    Execute a simple query to get all EHR IDs.
     
-    This test validates:
-    1. Executing a simple query to get all EHR IDs
-    2. Executing a query with parameters to get compositions for a specific template
+    Args:
+        ehrbase_client: The shared EHRbaseClient
     """
     # PART 1: EXECUTE SIMPLE QUERY FOR ALL EHR IDs
     print("\n=== TESTING SIMPLE AD-HOC QUERY ===")
     
-    # Query to get all EHR IDs
-    query = "SELECT e/ehr_id/value AS ehr_id FROM EHR e"
-    
     try:
-        # Execute the query
-        result = await ehrbase_client.execute_adhoc_query(query)
-        print(f"Query result: {json.dumps(result, indent=2)}")
+        # Execute the query to get all EHR IDs
+        result = await ehrbase_client.execute_adhoc_query(EHR_IDS_QUERY)
+        dbg("Query result", result)
         
         # Verify we received a valid response
         assert result is not None, "No query result received"
@@ -50,7 +57,14 @@ async def test_adhoc_query():
         print(f"Note: Simple query failed with error: {str(e)}")
         print("This may be expected if the EHRbase implementation does not support this feature")
         print("Continuing with the test...")
+
+async def run_parameterized_query(ehrbase_client):
+    """
+    Execute a query with parameters against a newly created EHR, then delete the EHR.
     
+    Args:
+        ehrbase_client: The shared EHRbaseClient
+    """
     # PART 2: EXECUTE QUERY WITH PARAMETERS
     print("\n=== TESTING PARAMETERIZED AD-HOC QUERY ===")
     
@@ -68,10 +82,14 @@ async def test_adhoc_query():
             "template_id": "vital_signs_oliver_deak.v1"
         }
         
+        delete_task = None
         try:
             # Execute the query with parameters
             result = await ehrbase_client.execute_adhoc_query(query, params)
-            print(f"Parameterized query result: {json.dumps(result, indent=2)}")
+            
+            # The EHR is no longer needed, so delete it while the result is checked
+            delete_task = asyncio.create_task(ehrbase_client.delete_ehr(ehr_id))
+            dbg("Parameterized query result", result)
             
             # Verify we received a valid response
             assert result is not None, "No query result received"
@@ -82,10 +100,10 @@ async def test_adhoc_query():
             print(f"Note: Parameterized query failed with error: {str(e)}")
             print("This may be expected if the EHRbase implementation does not support this feature")
         
-        # Clean up - delete the EHR
+        # Clean up - delete the EHR, unless the deletion is already under way
         print("\n=== CLEANING UP: DELETING TEST EHR ===")
         try:
-            await ehrbase_client.delete_ehr(ehr_id)
+            await (delete_task or ehrbase_client.delete_ehr(ehr_id))
             print(f"Successfully deleted test EHR with ID: {ehr_id}")
         except Exception as e:
             print(f"Warning: Failed to delete test EHR: {str(e)}")
@@ -93,6 +111,97 @@ async def test_adhoc_query():
         print(f"Error creating test EHR: {str(e)}")
         print("Skipping parameterized query test")
 
+@pytest.mark.asyncio
+async def test_adhoc_query(ehrbase_client):
+    """
+    Test executing ad-hoc AQL queries.
+    
+    This test validates:
+    1. Executing a simple query to get all EHR IDs
+    2. Executing a query with parameters to get compositions for a specific template
+    
+    The two parts share no data, so they run concurrently.
+    """
+    await asyncio.gather(
+        run_simple_query(ehrbase_client),
+        run_parameterized_query(ehrbase_client)
+    )
+
+@pytest.mark.asyncio
+async def test_adhoc_query_stream(ehrbase_client):
+    """
+    Test streaming the rows of an ad-hoc AQL query.
+    
+    This test validates that the streamed rows match the rows of the buffered query.
+    """
+    print("\n=== TESTING STREAMED AD-HOC QUERY ===")
+    
+    # Create an EHR so the result set is not empty
+    create_response = await ehrbase_client.create_ehr()
+    ehr_id = create_response["ehr_id"]
+    print(f"Created test EHR with ID: {ehr_id}")
+    
+    try:
+        # Collect the streamed rows and compare them to the buffered result
+        streamed_rows = [row async for row in ehrbase_client.execute_adhoc_query_stream(EHR_IDS_QUERY)]
+        result = await ehrbase_client.execute_adhoc_query(EHR_IDS_QUERY)
+        
+        assert streamed_rows == result["rows"], f"Streamed rows differ from buffered rows: {len(streamed_rows)} vs {len(result['rows'])}"
+        assert [ehr_id] in streamed_rows, f"Expected EHR {ehr_id} in streamed rows"
+        
+        print(f"Successfully streamed {len(streamed_rows)} rows")
+    finally:
+        # Clean up - delete the EHR
+        await ehrbase_client.delete_ehr(ehr_id)
+        print(f"Deleted test EHR with ID: {ehr_id}")
+
+@pytest.mark.asyncio
+async def test_stored_query(ehrbase_client):
+    """
+    Test storing an AQL query and executing it by name.
+    
+    The server parses a stored query once, so this validates that executing it
+    returns the same rows as the equivalent ad-hoc query. The query is stored under
+    a name unique to this run and deleted again afterwards.
+    """
+    print("\n=== TESTING STORED QUERY ===")
+    
+    query_name = f"{EHR_IDS_QUERY_NAME}_{uuid.uuid4().hex}"
+    try:
+        await ehrbase_client.store_query(query_name, EHR_IDS_QUERY, EHR_IDS_QUERY_VERSION)
+        print(f"Stored query {query_name}")
+    except Exception as e:
+        pytest.skip(f"Storing the query failed, EHRbase may not support stored queries: {e}")
+    
+    try:
+        # Create an EHR so the result set is not empty
+        create_response = await ehrbase_client.create_ehr()
+        ehr_id = create_response["ehr_id"]
+        print(f"Created test EHR with ID: {ehr_id}")
+        
+        try:
+            result = await ehrbase_client.execute_stored_query(query_name)
+            dbg("Stored query result", result)
+            
+            assert "rows" in result, f"Expected 'rows' in result: {result}"
+            assert [ehr_id] in result["rows"], f"Expected EHR {ehr_id} in stored query rows"
+            
+            print(f"Successfully executed stored query with {len(result['rows'])} rows")
+        finally:
+            # Clean up - delete the EHR
+            await ehrbase_client.delete_ehr(ehr_id)
+            print(f"Deleted test EHR with ID: {ehr_id}")
+    finally:
+        # Clean up - delete the stored query
+        assert await ehrbase_client.delete_stored_query(query_name, EHR_IDS_QUERY_VERSION), f"Failed to delete stored query {query_name}"
+        print(f"Deleted stored query {query_name}")
+
+async def main():
+    """Execute the tests directly for debugging on one event loop and one client, like the session fixture."""
+    async with EHRbaseClient() as ehrbase_client:
+        await test_adhoc_query(ehrbase_client)
+        await test_adhoc_query_stream(ehrbase_client)
+        await test_stored_query(ehrbase_client)
+
 if __name__ == "__main__":
-    # Execute the test directly for debugging
-    asyncio.run(test_adhoc_query())
+    asyncio.run(main())
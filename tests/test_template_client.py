@@ -3,33 +3,89 @@ Integration test for template operations using the TemplateClient.
 This test directly validates template operations against the EHRbase server.
 """
 import asyncio
-import os
-import json
+import httpx
+import logging
 import pytest
+import pytest_asyncio
 import sys
 from datetime import datetime
+from pathlib import Path
 
-# Add the parent directory to the path so we can import the src modules
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Under pytest, conftest.py adds the src directory to the path; add it when run directly
+if __name__ == "__main__":
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
 
 # Import the EHRbaseClient
-from src.ehrbase import EHRbaseClient
+from ehrbase import EHRbaseClient
 
-# Initialize the client
-ehrbase_client = EHRbaseClient()
+# Logs full template listings at DEBUG level; formatted only if DEBUG is enabled
+logger = logging.getLogger(__name__)
 
 # Test constants
 VITAL_SIGNS_TEMPLATE_ID = "vital_signs_basic.v1"
+NON_EXISTENT_TEMPLATE_ID = "non_existent_template.v1"
+
+# Node IDs of the vital signs components, as used in web template IDs and flat paths
+VITAL_SIGN_COMPONENTS = frozenset({"pulse_heart_beat", "blood_pressure", "pulse_oximetry", "height_length", "body_weight"})
+
+async def fetch_template_results(ehrbase_client):
+    """
+    Issue the independent template requests checked by the tests concurrently.
+    
+    Failures are returned in place of results, so a 404 for the non-existent
+    template does not cancel the other requests.
+    
+    Args:
+        ehrbase_client: The shared EHRbaseClient
+        
+    Returns:
+        Dict with the results of "templates", "template", "example" and "not_found"
+    """
+    results = await asyncio.gather(
+        ehrbase_client.templates.list_templates(),
+        ehrbase_client.templates.get_template(VITAL_SIGNS_TEMPLATE_ID),
+        ehrbase_client.templates.get_example_composition(VITAL_SIGNS_TEMPLATE_ID),
+        ehrbase_client.templates.get_template(NON_EXISTENT_TEMPLATE_ID),
+        return_exceptions=True
+    )
+    return dict(zip(("templates", "template", "example", "not_found"), results))
+
+def template_result(template_results, name):
+    """Return one of the fetched template results, raising it if the request failed."""
+    result = template_results[name]
+    if isinstance(result, BaseException):
+        raise result
+    return result
+
+def iter_strings(obj):
+    """Yield the string values nested anywhere in a JSON object, depth first."""
+    if isinstance(obj, dict):
+        for value in obj.values():
+            yield from iter_strings(value)
+    elif isinstance(obj, list):
+        for value in obj:
+            yield from iter_strings(value)
+    elif isinstance(obj, str):
+        yield obj
+
+def vital_sign_components(strings):
+    """Return the vital sign components mentioned in any of the given strings."""
+    return {component for value in strings for component in VITAL_SIGN_COMPONENTS if component in value}
+
+@pytest_asyncio.fixture(scope="module")
+async def template_results(ehrbase_client):
+    """Results of the template requests, fetched concurrently once for this module."""
+    return await fetch_template_results(ehrbase_client)
 
 @pytest.mark.asyncio
-async def test_list_templates():
+async def test_list_templates(template_results):
     """Test listing available templates directly using the TemplateClient."""
     
-    # List all templates using the client
-    templates = await ehrbase_client.templates.list_templates()
+    # All templates, as listed by the client
+    templates = template_result(template_results, "templates")
     
-    # Print the templates for debugging
-    print(f"Templates response: {templates}")
+    # Log the templates for debugging
+    logger.debug("Templates response: %s", templates)
     
     # Verify we received a valid response
     assert templates is not None, "No templates response received"
@@ -38,25 +94,37 @@ async def test_list_templates():
     # Check for expected template structure
     assert len(templates) > 0, "Expected at least one template in the response"
     
-    # Find our vital signs template in the list
-    vital_signs_found = False
-    for template in templates:
-        assert "template_id" in template, f"Expected 'template_id' in template data: {template}"
-        if template["template_id"] == VITAL_SIGNS_TEMPLATE_ID:
-            vital_signs_found = True
-            break
+    # Every template should carry an ID
+    missing = [template for template in templates if "template_id" not in template]
+    assert not missing, f"Expected 'template_id' in template data, missing from: {missing[:3]}"
     
-    assert vital_signs_found, f"Expected to find {VITAL_SIGNS_TEMPLATE_ID} in templates list"
+    # Find our vital signs template in the list
+    template_ids = {template["template_id"] for template in templates}
+    assert VITAL_SIGNS_TEMPLATE_ID in template_ids, f"Expected to find {VITAL_SIGNS_TEMPLATE_ID} in templates list"
     
     print(f"Successfully retrieved {len(templates)} templates")
     return templates
 
 @pytest.mark.asyncio
-async def test_get_template():
+async def test_list_template_ids(ehrbase_client):
+    """Test listing only the template IDs, parsed from the streamed template list."""
+    
+    template_ids = await ehrbase_client.templates.list_template_ids()
+    logger.debug("Template IDs: %s", template_ids)
+    
+    # The IDs should match those in the full template listing
+    templates = await ehrbase_client.templates.list_templates()
+    assert template_ids == [template["template_id"] for template in templates], "Template IDs differ from the template list"
+    assert VITAL_SIGNS_TEMPLATE_ID in template_ids, f"Expected to find {VITAL_SIGNS_TEMPLATE_ID} in template IDs"
+    
+    print(f"Successfully retrieved {len(template_ids)} template IDs")
+
+@pytest.mark.asyncio
+async def test_get_template(template_results):
     """Test retrieving a specific template by ID directly using the TemplateClient."""
     
-    # Get the vital signs template using the client
-    template = await ehrbase_client.templates.get_template(VITAL_SIGNS_TEMPLATE_ID)
+    # The vital signs template, as retrieved by the client
+    template = template_result(template_results, "template")
     
     # Print template info for debugging
     print(f"Template response type: {type(template)}")
@@ -76,27 +144,33 @@ async def test_get_template():
         assert template["templateId"] == VITAL_SIGNS_TEMPLATE_ID, "Template ID mismatch"
         
         # Check for vital signs elements in the template
-        vital_sign_components = ["pulse", "heart", "blood pressure", "oxygen", "height", "weight"]
-        component_found = False
-        template_str = json.dumps(template).lower()
-        
-        for component in vital_sign_components:
-            if component in template_str:
-                component_found = True
-                print(f"Found vital sign component: {component}")
-                break
-                
-        assert component_found, f"Expected at least one vital sign component in template: {vital_sign_components}"
+        components_found = vital_sign_components(iter_strings(template))
+        assert components_found, f"Expected at least one vital sign component in template: {sorted(VITAL_SIGN_COMPONENTS)}"
+        print(f"Found vital sign components in template: {sorted(components_found)}")
     
     print(f"Successfully retrieved template: {VITAL_SIGNS_TEMPLATE_ID}")
     return template
 
 @pytest.mark.asyncio
-async def test_get_example_composition():
+async def test_get_templates_bulk(ehrbase_client):
+    """Test retrieving several templates concurrently using the TemplateClient."""
+    
+    template_ids = await ehrbase_client.templates.list_template_ids()
+    templates = await ehrbase_client.templates.get_templates_bulk(template_ids)
+    
+    # Results should come back in request order
+    assert len(templates) == len(template_ids), "Template count mismatch"
+    for template_id, template in zip(template_ids, templates):
+        assert template["templateId"] == template_id, f"Template ID mismatch for {template_id}"
+    
+    print(f"Successfully retrieved {len(templates)} templates concurrently")
+
+@pytest.mark.asyncio
+async def test_get_example_composition(template_results):
     """Test generating an example composition directly using the TemplateClient."""
     
-    # Generate an example composition for the vital signs template
-    example = await ehrbase_client.templates.get_example_composition(VITAL_SIGNS_TEMPLATE_ID)
+    # The example composition generated for the vital signs template
+    example = template_result(template_results, "example")
     
     # Print example info for debugging
     print(f"Example response type: {type(example)}")
@@ -108,49 +182,69 @@ async def test_get_example_composition():
     # Check for expected format in the flat JSON example composition
     # Keys should contain the template ID
     template_prefix = f"{VITAL_SIGNS_TEMPLATE_ID}/"
-    template_keys_found = False
-    
-    for key in example.keys():
-        if key.startswith(template_prefix):
-            template_keys_found = True
-            break
-    
-    assert template_keys_found, f"Expected keys starting with '{template_prefix}' in example composition"
+    assert any(key.startswith(template_prefix) for key in example), f"Expected keys starting with '{template_prefix}' in example composition"
     
     # Check for vital signs components in the example
-    vital_sign_fields = ["pulse_heart_beat", "blood_pressure", "pulse_oximetry", "height_length", "body_weight"]
-    components_found = []
-    
-    for key in example.keys():
-        for field in vital_sign_fields:
-            if field in key and field not in components_found:
-                components_found.append(field)
-    
-    assert len(components_found) > 0, f"Expected at least one vital sign component in example composition"
-    print(f"Found vital sign components in example composition: {components_found}")
+    components_found = vital_sign_components(example)
+    assert components_found, f"Expected at least one vital sign component in example composition"
+    print(f"Found vital sign components in example composition: {sorted(components_found)}")
     
     print(f"Successfully generated example composition for template: {VITAL_SIGNS_TEMPLATE_ID}")
     return example
 
 @pytest.mark.asyncio
-async def test_get_template_not_found():
+async def test_get_template_not_found(template_results):
     """Test retrieving a non-existent template directly using the TemplateClient."""
-    non_existent_id = "non_existent_template.v1"
     
-    try:
-        # Attempt to get a non-existent template
-        template = await ehrbase_client.templates.get_template(non_existent_id)
-        assert False, f"Expected exception when requesting non-existent template, but got response: {template}"
-    except Exception as e:
-        # We expect an exception when the template doesn't exist
-        print(f"Got expected exception when requesting non-existent template: {e}")
-        assert "404" in str(e) or "Not Found" in str(e), f"Expected 404 error for non-existent template, got: {e}"
+    # We expect an HTTP error when the template doesn't exist
+    e = template_results["not_found"]
+    assert isinstance(e, httpx.HTTPStatusError), f"Expected HTTP error when requesting non-existent template, but got: {e!r}"
+    status_code = e.response.status_code
+    print(f"Got expected HTTP {status_code} when requesting non-existent template")
+    assert status_code == 404, f"Expected 404 error for non-existent template, got: {status_code}"
     
     print(f"Successfully confirmed error handling for non-existent template")
 
+@pytest.mark.asyncio
+async def test_cached_example_is_copied():
+    """
+    Test that changing a cached example composition does not change later results.
+    
+    This runs against an in-process httpx.MockTransport, which counts the requests
+    so the second lookup is known to come from the template cache.
+    """
+    requests = []
+    example_key = f"{VITAL_SIGNS_TEMPLATE_ID}/pulse_heart_beat/rate|magnitude"
+    
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json={example_key: 60.0})
+    
+    async with EHRbaseClient(transport=httpx.MockTransport(handler)) as client:
+        first = await client.get_template_example(VITAL_SIGNS_TEMPLATE_ID)
+        first[example_key] = 75.0
+        
+        second = await client.get_template_example(VITAL_SIGNS_TEMPLATE_ID)
+        assert len(requests) == 1, f"Expected the second example to come from the cache, got {len(requests)} requests"
+        assert second == {example_key: 60.0}, f"Cached example was changed by a caller: {second}"
+        
+        second[example_key] = 80.0
+        third = await client.get_template_example(VITAL_SIGNS_TEMPLATE_ID)
+        assert third == {example_key: 60.0}, f"Cached example was shared between callers: {third}"
+    
+    print("Successfully confirmed that cached examples are copied per caller")
+
+async def main():
+    """Run the tests directly for debugging on one event loop and one client, like the session fixture."""
+    async with EHRbaseClient() as ehrbase_client:
+        template_results = await fetch_template_results(ehrbase_client)
+        await test_list_templates(template_results)
+        await test_list_template_ids(ehrbase_client)
+        await test_get_template(template_results)
+        await test_get_templates_bulk(ehrbase_client)
+        await test_get_example_composition(template_results)
+        await test_get_template_not_found(template_results)
+    await test_cached_example_is_copied()
+
 if __name__ == "__main__":
-    # Run the tests directly for debugging
-    asyncio.run(test_list_templates())
-    asyncio.run(test_get_template())
-    asyncio.run(test_get_example_composition())
-    asyncio.run(test_get_template_not_found())
+    asyncio.run(main())